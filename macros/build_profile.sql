@@ -0,0 +1,61 @@
+{% macro create_build_profile_table() %}
+    {#
+      Run on-run-start: one row per (invocation, model, phase) recorded by
+      record_build_profile(). Created up front because models build in parallel
+      threads and concurrent CREATE IF NOT EXISTS calls conflict in DuckDB.
+      scripts/profile_build.py joins it with target/run_results.json.
+    #}
+    create table if not exists main.dbt_build_profile (
+        invocation_id varchar,
+        unique_id varchar,
+        phase varchar,
+        seconds double,
+        recorded_at timestamp
+    )
+{% endmacro %}
+
+
+{% macro profile_phase(phases, phase, started) %}
+    {# Append the elapsed time since `started` for `phase`; returns the new start. #}
+    {% set now = modules.datetime.datetime.now() %}
+    {% do phases.append({'phase': phase, 'seconds': (now - started).total_seconds()}) %}
+    {{ return(now) }}
+{% endmacro %}
+
+
+{% macro start_query_profile(phase) %}
+    {#
+      With --vars '{profile_queries: true}', write DuckDB's JSON query profile (the
+      EXPLAIN ANALYZE operator tree) for the next statements to
+      target/query_profile__<model>__<phase>.json until stop_query_profile().
+    #}
+    {% if var('profile_queries', false) %}
+        {% call statement('start_query_profile') -%}
+            SET enable_profiling = 'json'
+        {%- endcall %}
+        {% call statement('query_profile_output') -%}
+            SET profiling_output = 'target/query_profile__{{ model.name }}__{{ phase }}.json'
+        {%- endcall %}
+    {% endif %}
+{% endmacro %}
+
+
+{% macro stop_query_profile() %}
+    {% if var('profile_queries', false) %}
+        {% call statement('stop_query_profile') -%}
+            PRAGMA disable_profiling
+        {%- endcall %}
+    {% endif %}
+{% endmacro %}
+
+
+{% macro record_build_profile(phases) %}
+    {% if phases %}
+        {% call statement('record_build_profile') -%}
+            insert into main.dbt_build_profile values
+            {% for p in phases -%}
+            ('{{ invocation_id }}', '{{ model.unique_id }}', '{{ p.phase }}', {{ p.seconds }}, now()){{ "," if not loop.last }}
+            {% endfor %}
+        {%- endcall %}
+    {% endif %}
+{% endmacro %}
@@ -0,0 +1,17 @@
+{% macro churn_threshold_days() %}
+    {#
+      Days without an order after which a customer is at risk of churning.
+      Read from the `churn_threshold_days` var so the model, the dbt tests, the
+      Trino invariants and the generated Soda checks share one value. It must be
+      one of the `recency_cohort_days` buckets so at_risk_customers is a plain
+      partition filter over customer_recency_cohorts.
+    #}
+    {% set threshold = var('churn_threshold_days') | int %}
+    {% set cohorts = var('recency_cohort_days') %}
+    {% if threshold not in cohorts %}
+        {{ exceptions.raise_compiler_error(
+            "churn_threshold_days=" ~ threshold ~ " must be one of recency_cohort_days " ~ cohorts
+        ) }}
+    {% endif %}
+    {{ return(threshold) }}
+{% endmacro %}
@@ -1,8 +1,21 @@
 {% materialization external, adapter="duckdb", supported_languages=['sql', 'python'] %}
   {#
     Override of dbt-duckdb's external materialization that adds `format: iceberg` support.
-    For iceberg, DuckDB's COPY ... TO ... (FORMAT ICEBERG, ALLOW_OVERWRITE TRUE) is used.
+    For iceberg, DuckDB's COPY ... TO ... (FORMAT ICEBERG, ALLOW_OVERWRITE TRUE) is used;
+    an optional `partition_by` config (column or list of columns) is passed as PARTITION_BY.
+    Iceberg-only Parquet write tuning:
+      - parquet_options: dict of DuckDB Parquet writer options (compression,
+        compression_level, row_group_size, file_size_bytes, dictionary_size_limit,
+        bloom_filter_false_positive_ratio, parquet_version); replaced as a whole
+        by the `parquet_options_override` var when it is set (used by benchmarks).
+      - cluster_by: column or list; rows are written sorted by it so row-group
+        min/max statistics prune point lookups on those keys. Disabled when the
+        `cluster_by_enabled` var is false.
+    DuckDB writes a Parquet bloom filter for every dictionary-encoded column chunk;
+    a dictionary_size_limit of at least row_group_size keeps unique keys
+    dictionary-encoded, so they get bloom filters too.
     The view is created via iceberg_scan() so downstream models can ref() this model.
+    Per-statement timings are recorded in main.dbt_build_profile (macros/build_profile.sql).
   #}
 
   {%- set location = render(config.get('location', default=external_location(this, config))) -%})
@@ -20,6 +33,23 @@
     {%- set read_location = adapter.external_read_location(location, rendered_options) -%}
   {%- else -%}
     {%- set read_location = location -%}
+    {%- set partition_by = config.get('partition_by') -%}
+    {%- if partition_by is string -%}
+      {%- set partition_by = [partition_by] -%}
+    {%- endif -%}
+    {%- set cluster_by = config.get('cluster_by') if var('cluster_by_enabled', true) else none -%}
+    {%- if cluster_by is string -%}
+      {%- set cluster_by = [cluster_by] -%}
+    {%- endif -%}
+    {%- set parquet_options = var('parquet_options_override', {}) or config.get('parquet_options', {}) -%}
+    {%- set allowed_parquet_options = ['compression', 'compression_level', 'row_group_size',
+        'file_size_bytes', 'dictionary_size_limit',
+        'bloom_filter_false_positive_ratio', 'parquet_version'] -%}
+    {%- for key in parquet_options -%}
+      {%- if key not in allowed_parquet_options -%}
+        {{ exceptions.raise_compiler_error("Invalid parquet_options key: " ~ key ~ ". Allowed keys are: " ~ allowed_parquet_options | join(', ')) }}
+      {%- endif -%}
+    {%- endfor -%}
   {%- endif -%}
 
   {%- set parquet_read_options = config.get('parquet_read_options', {'union_by_name': False}) -%}
@@ -45,16 +75,33 @@
   {{ run_hooks(pre_hooks, inside_transaction=False) }}
   {{ run_hooks(pre_hooks, inside_transaction=True) }}
 
+  {%- set phases = [] -%}
+  {%- set phase_start = modules.datetime.datetime.now() -%}
+
   -- build model into a temp table
+  {{ start_query_profile('create_table') }}
   {% call statement('create_table', language=language) -%}
     {{- create_table_as(False, temp_relation, compiled_code, language) }}
   {%- endcall %}
+  {{ stop_query_profile() }}
+  {%- set phase_start = profile_phase(phases, 'create_table', phase_start) -%}
 
   -- write temp table to the target format / location
   {% if format == 'iceberg' %}
+    {{ start_query_profile('write_iceberg') }}
     {% call statement('write_iceberg') -%}
-      COPY {{ temp_relation }} TO '{{ location }}' (FORMAT ICEBERG, ALLOW_OVERWRITE TRUE)
+      COPY (
+        SELECT * FROM {{ temp_relation }}
+        {%- if cluster_by %} ORDER BY {{ cluster_by | join(', ') }}{% endif %}
+      ) TO '{{ location }}' (FORMAT ICEBERG, ALLOW_OVERWRITE TRUE
+        {%- if partition_by %}, PARTITION_BY ({{ partition_by | join(', ') }}){% endif -%}
+        {%- for key, value in parquet_options.items() -%}
+          , {{ key | upper }} {{ "'" ~ value ~ "'" if value is string else value }}
+        {%- endfor -%}
+      )
     {%- endcall %}
+    {{ stop_query_profile() }}
+    {%- set phase_start = profile_phase(phases, 'write_iceberg', phase_start) -%}
 
     -- create a local DuckDB view over iceberg_scan for downstream ref()
     {% call statement('main', language='sql') -%}
@@ -99,6 +146,7 @@
       )
     {%- endcall %}
   {% endif %}
+  {%- set phase_start = profile_phase(phases, 'main' if format == 'iceberg' else 'write_' ~ format, phase_start) -%}
 
   -- swap relations
   {% if existing_relation is not none %}
@@ -111,6 +159,8 @@
   {% set should_revoke = should_revoke(existing_relation, full_refresh_mode=True) %}
   {% do apply_grants(target_relation, grant_config, should_revoke=should_revoke) %}
   {% do persist_docs(target_relation, model) %}
+  {%- set phase_start = profile_phase(phases, 'swap', phase_start) -%}
+  {{ record_build_profile(phases) }}
 
   {{ adapter.commit() }}
 
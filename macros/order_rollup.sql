@@ -0,0 +1,19 @@
+{% macro order_rollup(source, grain, time_column='order_date', count_expression='count(*)') %}
+    {#
+      Pre-aggregates order facts to (period_start, status) at the given date_trunc grain.
+      Finer rollups are built from marts.orders; coarser ones re-aggregate a finer rollup
+      (time_column='period_start', count_expression='sum(order_count)') so each level
+      reads the smallest input that nests into it.
+    #}
+    select
+        CAST(date_trunc('{{ grain }}', {{ time_column }}) AS DATE) as period_start,
+        status,
+        CAST({{ count_expression }} AS BIGINT) as order_count,
+        CAST(sum(amount) AS BIGINT) as amount,
+        {% for payment_method in var('payment_methods') -%}
+        CAST(sum({{ payment_method }}_amount) AS BIGINT) as {{ payment_method }}_amount{{ "," if not loop.last }}
+        {% endfor %}
+    from {{ source }}
+    group by 1, 2
+    order by 1, 2
+{% endmacro %}
@@ -0,0 +1,120 @@
+{% macro rolling_metrics(daily_totals, windows, grains) %}
+    {#
+      Emits rolling metrics for every (window, grain) pair from a single pass over
+      a daily totals CTE/relation with columns (order_date, total_amount_cents, order_count).
+
+      - grains  : date_trunc parts, e.g. ['day', 'week', 'month']. Rolled up with
+                  GROUPING SETS so the daily totals are aggregated once for all grains.
+      - windows : trailing window lengths in days, e.g. [7, 30, 90]. At each grain a
+                  window covers a whole number of periods: N days rounded to the nearest
+                  number of periods (GRAIN_DAYS), and never less than the current period.
+                  With the defaults: 7d = 7 days / 1 week / 1 month, 30d = 30 days /
+                  4 weeks / 1 month, 90d = 90 days / 13 weeks / 3 months. Frames are
+                  RANGE over period_index, so periods without orders still count: the
+                  average is the frame's sum over the periods it covers (capped at the
+                  grain's first period in the data), not AVG over the non-empty rows.
+                  Every frame shares the same PARTITION BY grain ORDER BY period_index,
+                  so DuckDB sorts once and evaluates all frames over that sort.
+
+      Call it as the tail of a WITH list (after a trailing comma): it emits its own
+      CTEs followed by the final SELECT. Adding a window adds columns rather than
+      another model.
+    #}
+
+    {%- set GRAIN_DAYS = {'day': 1, 'week': 7, 'month': 30, 'quarter': 91, 'year': 365} %}
+    {%- for grain in grains if grain not in GRAIN_DAYS %}
+        {{ exceptions.raise_compiler_error("rolling_metrics: unsupported grain '" ~ grain ~ "' (expected one of " ~ GRAIN_DAYS.keys() | join(', ') ~ ")") }}
+    {%- endfor %}
+
+    grain_keys AS (
+        SELECT
+            {% for grain in grains -%}
+            CAST(date_trunc('{{ grain }}', order_date) AS DATE) AS {{ grain }}_start,
+            {% endfor -%}
+            total_amount_cents,
+            order_count
+        FROM {{ daily_totals }}
+    ),
+
+    grain_totals AS (
+        SELECT
+            CASE
+                {% for grain in grains -%}
+                WHEN GROUPING({{ grain }}_start) = 0 THEN '{{ grain }}'
+                {% endfor -%}
+            END AS grain,
+            COALESCE({% for grain in grains %}{{ grain }}_start{{ ", " if not loop.last }}{% endfor %}) AS period_start,
+            -- Consecutive periods of a grain are consecutive integers.
+            CASE
+                {% for grain in grains -%}
+                WHEN GROUPING({{ grain }}_start) = 0 THEN date_diff('{{ grain }}', DATE '1970-01-01', {{ grain }}_start)
+                {% endfor -%}
+            END AS period_index,
+            SUM(total_amount_cents) AS total_amount_cents,
+            SUM(order_count) AS order_count
+        FROM grain_keys
+        GROUP BY GROUPING SETS (
+            {% for grain in grains -%}
+            ({{ grain }}_start){{ "," if not loop.last }}
+            {% endfor -%}
+        )
+    ),
+
+    rolling AS (
+        SELECT
+            grain,
+            period_start,
+            total_amount_cents,
+            order_count
+            {%- for n in windows %}
+            {%- for column, aggregate in [('amount_cents', 'SUM(total_amount_cents)'),
+                                          ('orders', 'SUM(order_count)')] %},
+            CASE grain
+                {% for grain in grains -%}
+                WHEN '{{ grain }}' THEN {{ aggregate }} OVER w{{ n }}_{{ grain }}
+                {% endfor -%}
+            END AS rolling_{{ n }}d_{{ column }}
+            {%- endfor %},
+            -- Periods the frame covers, empty ones included: the divisor of the average.
+            LEAST(
+                CASE grain
+                    {% for grain in grains -%}
+                    WHEN '{{ grain }}' THEN {{ [(n / GRAIN_DAYS[grain]) | round | int, 1] | max }}
+                    {% endfor -%}
+                END,
+                period_index - FIRST_VALUE(period_index) OVER w_history + 1
+            ) AS rolling_{{ n }}d_periods
+            {%- endfor %}
+        FROM grain_totals
+        WINDOW
+            w_history AS (
+                PARTITION BY grain
+                ORDER BY period_index
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ),
+            {% for n in windows -%}
+            {% set outer_loop = loop -%}
+            {% for grain in grains -%}
+            w{{ n }}_{{ grain }} AS (
+                PARTITION BY grain
+                ORDER BY period_index
+                RANGE BETWEEN {{ [(n / GRAIN_DAYS[grain]) | round | int, 1] | max - 1 }} PRECEDING AND CURRENT ROW
+            ){{ "," if not (loop.last and outer_loop.last) }}
+            {% endfor -%}
+            {% endfor %}
+    )
+
+    SELECT
+        grain,
+        period_start,
+        CAST(total_amount_cents / 100.0 AS DECIMAL(18,2)) AS total_amount,
+        CAST(order_count AS BIGINT) AS order_count
+        {%- for n in windows %},
+        CAST(rolling_{{ n }}d_amount_cents / 100.0 AS DECIMAL(18,2)) AS rolling_{{ n }}d_amount,
+        CAST(rolling_{{ n }}d_orders AS BIGINT) AS rolling_{{ n }}d_orders,
+        CAST(rolling_{{ n }}d_amount_cents / rolling_{{ n }}d_periods / 100.0 AS DECIMAL(18,2)) AS rolling_{{ n }}d_avg_amount
+        {%- endfor %}
+    FROM rolling
+    ORDER BY grain, period_start
+
+{% endmacro %}
@@ -1,14 +1,16 @@
-{% macro validate_contracts() %}
-    {# Get all models with the 'serving' tag #}
+{% macro validate_contracts(models=none) %}
+    {# Get all models with the 'serving' tag, or only those named in models
+       (run_checks.sh --changed passes the models selected by state:modified+) #}
     {% set models_to_validate = [] %}
     {% for node in graph.nodes.values() | selectattr("resource_type", "equalto", "model") %}
-        {% if 'serving' in node.config.tags and node.config.contract.enforced %}
+        {% if 'serving' in node.config.tags and node.config.contract.enforced
+              and (models is none or node.name in models) %}
             {% do models_to_validate.append(node) %}
         {% endif %}
     {% endfor %}
 
     {% if models_to_validate | length == 0 %}
-        {{ log("No models found with tag 'serving' and enforced contract.", info=True) }}
+        {{ log("No " ~ ("selected " if models is not none else "") ~ "models found with tag 'serving' and enforced contract.", info=True) }}
         {{ return(None) }}
     {% endif %}
 
@@ -1,54 +1,19 @@
-with customers as (
-
-    select * from {{ ref('stg_customers') }}
-
-),
-
-orders as (
-
-    select * from {{ ref('stg_orders') }}
-
-),
-
--- Get the most recent order date across all data to use as "current date"
-current_date_cte as (
-    select max(order_date) as current_date
-    from orders
-),
-
-customer_order_summary as (
-
-    select
-        customer_id,
-        min(order_date) as first_order_date,
-        max(order_date) as last_order_date,
-        count(*) as total_orders,
-        sum(case when status = 'completed' then 1 else 0 end) as completed_orders
-    from orders
-    group by customer_id
-
-),
-
-at_risk_customers as (
-
-    select
-        c.customer_id,
-        c.first_name,
-        c.last_name,
-        cos.first_order_date,
-        cos.last_order_date,
-        cos.total_orders,
-        CAST(cos.completed_orders AS BIGINT) as completed_orders,
-        cd.current_date as reference_date,
-        CAST((cd.current_date - cos.last_order_date) AS INTEGER) as days_since_last_order
-    from customers c
-    inner join customer_order_summary cos
-        on c.customer_id = cos.customer_id
-    cross join current_date_cte cd
-    where (cd.current_date - cos.last_order_date) > 60
-        and cos.total_orders > 0  -- ensure they have prior activity
-
-)
-
-select * from at_risk_customers
-order by days_since_last_order desc
\ No newline at end of file
+{#-
+    Partition filter over customer_recency_cohorts: customers with no order for more
+    than churn_threshold_days (var, default 60) days before the reference date.
+    A full rebuild like customer_recency_cohorts, for the same reasons.
+-#}
+
+select
+    customer_id,
+    first_name,
+    last_name,
+    first_order_date,
+    last_order_date,
+    total_orders,
+    completed_orders,
+    reference_date,
+    days_since_last_order
+from {{ ref('customer_recency_cohorts') }}
+where recency_cohort_days >= {{ churn_threshold_days() }}
+order by days_since_last_order desc
@@ -0,0 +1,63 @@
+{{ config(
+    materialized='external',
+    format='iceberg',
+    schema='ddi',
+    partition_by='recency_cohort_days'
+) }}
+
+{#-
+    Buckets every active customer into a recency cohort in one pass over
+    customer_order_state. recency_cohort_days is the largest bucket from the
+    `recency_cohort_days` var that days_since_last_order strictly exceeds (0 if none),
+    so "inactive for more than N days" is the partition filter recency_cohort_days >= N.
+
+    Rebuilt in full from the state (one row per customer) rather than incrementally
+    on the customers with new orders: days_since_last_order is relative to the latest
+    order date over all customers, so every row changes whenever that date moves,
+    and the external materialization only writes whole Iceberg tables.
+-#}
+{%- set cohorts = var('recency_cohort_days') | sort(reverse=true) -%}
+
+with state as (
+
+    select
+        *,
+        max(last_order_date) over () as reference_date
+    from {{ ref('customer_order_state') }}
+    where total_orders > 0  -- ensure they have prior activity
+
+),
+
+customers as (
+
+    select * from {{ ref('stg_customers') }}
+
+),
+
+scored as (
+
+    select
+        c.customer_id,
+        c.first_name,
+        c.last_name,
+        s.first_order_date,
+        s.last_order_date,
+        s.total_orders,
+        s.completed_orders,
+        s.reference_date,
+        CAST((s.reference_date - s.last_order_date) AS INTEGER) as days_since_last_order
+    from state s
+    inner join customers c
+        on c.customer_id = s.customer_id
+
+)
+
+select
+    *,
+    case
+        {% for days in cohorts -%}
+        when days_since_last_order > {{ days }} then {{ days }}
+        {% endfor -%}
+        else 0
+    end as recency_cohort_days
+from scored
@@ -0,0 +1,32 @@
+{{ config(
+    materialized='external',
+    format='iceberg',
+    schema='ddi',
+    partition_by='grain'
+) }}
+
+{#- Windows and grains come from dbt_project.yml vars; the contract in schema.yml
+    lists one amount/orders/avg column triple per window. -#}
+{%- set windows = var('rolling_metric_windows') -%}
+{%- set grains = var('rolling_metric_grains') -%}
+
+WITH completed_orders AS (
+    SELECT
+        CAST(o.order_date AS DATE) AS order_date,
+        p.amount  -- cents, BIGINT
+    FROM {{ ref('stg_orders') }} o
+    INNER JOIN {{ ref('stg_payments') }} p
+        ON o.order_id = p.order_id
+    WHERE o.status = 'completed'
+),
+
+daily_totals AS (
+    SELECT
+        order_date,
+        SUM(amount) AS total_amount_cents,
+        COUNT(*) AS order_count
+    FROM completed_orders
+    GROUP BY order_date
+),
+
+{{ rolling_metrics('daily_totals', windows, grains) }}
@@ -0,0 +1 @@
+{{ order_rollup(ref('orders'), 'day') }}
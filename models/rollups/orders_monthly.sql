@@ -0,0 +1 @@
+{{ order_rollup(ref('orders_daily'), 'month', time_column='period_start', count_expression='sum(order_count)') }}
@@ -3,8 +3,14 @@
 # Iceberg tables, generate and run Soda checks.
 #
 # Usage:
-#   ./run_checks.sh            # normal run
-#   ./run_checks.sh --no-infra # skip podman start (infra already running)
+#   ./run_checks.sh              # normal run
+#   ./run_checks.sh --no-infra   # skip podman start (infra already running)
+#   ./run_checks.sh --local-only # validate in embedded DuckDB only; skip the
+#                                # Trino, Soda and Superset smoke steps
+#   ./run_checks.sh --changed    # rebuild and re-check only the models changed
+#                                # since the last successful run (state:modified+)
+#   ./run_checks.sh --sharded    # build external models as parallel dbt
+#                                # processes (scripts/sharded_build.py)
 
 set -euo pipefail
 
@@ -14,10 +20,41 @@ cd "$SCRIPT_DIR"
 source venv/bin/activate
 
 NO_INFRA=false
+LOCAL_ONLY=false
+CHANGED=false
+SHARDED=false
 for arg in "$@"; do
   [[ "$arg" == "--no-infra" ]] && NO_INFRA=true
+  [[ "$arg" == "--local-only" ]] && LOCAL_ONLY=true
+  [[ "$arg" == "--changed" ]] && CHANGED=true
+  [[ "$arg" == "--sharded" ]] && SHARDED=true
 done
 
+# Publish each external model to the REST catalog as dbt writes it
+# (scripts/iceberg_catalog_plugin.py). --local-only never reaches Trino, so it
+# keeps the profile's default (off) unless the caller set the variable.
+if [[ "$LOCAL_ONLY" == false ]]; then
+  export LAKEHOUSE_CATALOG_COMMIT="${LAKEHOUSE_CATALOG_COMMIT:-true}"
+fi
+
+if [[ "$CHANGED" == true && "$SHARDED" == true ]]; then
+  echo "--changed and --sharded cannot be combined" >&2
+  exit 2
+fi
+
+# Every stage below runs as a span of one trace (scripts/tracing.py); the
+# critical path is printed on exit, including after a failed stage.
+mkdir -p target
+export PIPELINE_TRACE_FILE="$SCRIPT_DIR/target/pipeline_trace.jsonl"
+export PIPELINE_TRACE_ID="$(python scripts/tracing.py trace-id)"
+trap 'echo ""; python scripts/trace_summary.py "$PIPELINE_TRACE_FILE" || true' EXIT
+
+stage() {
+  local name="$1"
+  shift
+  python scripts/tracing.py run "$name" -- "$@"
+}
+
 # ── 1. Infrastructure ────────────────────────────────────────────────────────
 if [[ "$NO_INFRA" == false ]]; then
   echo "==> Starting Podman machine"
@@ -34,50 +71,88 @@ if [[ "$NO_INFRA" == false ]]; then
 fi
 
 # ── 2. dbt build ────────────────────────────────────────────────────────────
+# --changed: compare with the manifest saved by the last successful run and
+# select state:modified+. PIPELINE_SELECTION restricts every later stage to the
+# selected tables (scripts/pipeline_selection.py).
+STATE_DIR=target/last_run_state
+DBT_SELECT=()
+if [[ "$CHANGED" == true ]]; then
+  echo ""
+  if [[ -f "$STATE_DIR/manifest.json" ]]; then
+    echo "==> Selecting models changed since the last successful run (state:modified+)"
+    stage "select changed" python scripts/pipeline_selection.py select --state "$STATE_DIR"
+    export PIPELINE_SELECTION="$SCRIPT_DIR/target/selection.json"
+    if ! python scripts/pipeline_selection.py selected; then
+      echo "Nothing changed since the last successful run."
+      exit 0
+    fi
+    DBT_SELECT=(--select state:modified+ --state "$STATE_DIR")
+  else
+    echo "==> No saved state in $STATE_DIR: running the full pipeline"
+  fi
+fi
+
 echo ""
-echo "==> dbt build (seed + run + test)"
-dbt build
+if [[ "$SHARDED" == true ]]; then
+  echo "==> Sharded dbt build (seed + parallel external model shards + test)"
+  stage "sharded dbt build" python scripts/sharded_build.py
+else
+  echo "==> dbt build (seed + run + test)"
+  stage "dbt build" dbt build ${DBT_SELECT[@]+"${DBT_SELECT[@]}"}
+fi
 
-# ── 3. Register Iceberg tables in REST catalog ───────────────────────────────
+# ── 2b. Local validation (embedded DuckDB, no Trino) ─────────────────────────
 echo ""
-echo "==> Registering Iceberg tables"
-python scripts/register_iceberg_tables.py
+echo "==> Local DuckDB validation (invariants + contract checks)"
+stage "local validation" python scripts/validate_local.py
 
-# ── 4. dbt contract validation ───────────────────────────────────────────────
+# ── 3. dbt contract validation ───────────────────────────────────────────────
 echo ""
 echo "==> Validating dbt contracts (serving-tagged models)"
-dbt run-operation validate_contracts
+stage "contract validation" dbt run-operation validate_contracts \
+  --args "$(python scripts/pipeline_selection.py models)"
+
+# The state for --changed is saved only after a full set of checks, so a
+# --local-only run never hides a model from the next run's Trino checks.
+if [[ "$LOCAL_ONLY" == true ]]; then
+  echo ""
+  echo "All local checks passed (Trino, Soda and Superset smoke steps skipped)."
+  exit 0
+fi
 
-# ── 5. Trino + Iceberg integration tests ────────────────────────────────────
+# ── 4-6. Register Iceberg tables, Trino tests, reconcile, generate Soda checks ─
+# One process (scripts/lakehouse.py): imports and S3/REST/Trino clients are shared.
+# dbt build already committed each table to the REST catalog; `register` only
+# catches up tables built without LAKEHOUSE_CATALOG_COMMIT=true. `reconcile`
+# hash-compares what dbt wrote with what Trino serves.
 echo ""
-echo "==> Trino + Iceberg integration tests"
-python scripts/test_trino.py
+echo "==> Registering Iceberg tables, Trino + Iceberg integration tests, reconciliation, Soda check generation"
+stage "register + trino tests + reconcile + soda gen" \
+  python scripts/lakehouse.py register + test-trino + reconcile + soda-gen
 
 # ── 7. Soda checks ───────────────────────────────────────────────────────────
+soda_scan() {
+  local table="$1"
+  echo ""
+  if ! python scripts/pipeline_selection.py selected "ddi.$table"; then
+    echo "==> Soda checks: $table unchanged, skipped"
+    return
+  fi
+  echo "==> Running Soda checks: $table"
+  stage "soda $table" soda scan -d jaffle_shop_datasource -c soda/configuration.yml \
+    "soda/soda_checks_$table.yml"
+}
+
+soda_scan rolling_30_day_orders
+soda_scan at_risk_customers
+
+
+# ── 8-9. Superset setup (idempotent) and integration tests ──────────────────
 echo ""
-echo "==> Generating Soda checks from dbt contracts"
-python scripts/generate_soda_from_dbt_contract.py
-
-echo ""
-echo "==> Running Soda checks: rolling_30_day_orders"
-soda scan -d jaffle_shop_datasource -c soda/configuration.yml \
-  soda/soda_checks_rolling_30_day_orders.yml
-
-echo ""
-echo "==> Running Soda checks: at_risk_customers"
-soda scan -d jaffle_shop_datasource -c soda/configuration.yml \
-  soda/soda_checks_at_risk_customers.yml
+echo "==> Setting up Superset (Trino database, datasets, dashboard) and running its integration tests"
+stage "superset setup + tests" python scripts/lakehouse.py superset-setup + superset-test
 
-
-# ── 8. Superset setup (idempotent) ───────────────────────────────────────────
-echo ""
-echo "==> Setting up Superset (Trino database, datasets, dashboard)"
-python scripts/setup_superset.py
-
-# ── 9. Superset integration tests ────────────────────────────────────────────
-echo ""
-echo "==> Running Superset integration tests"
-python scripts/test_superset.py
+python scripts/pipeline_selection.py save --state "$STATE_DIR"
 
 echo ""
 echo "All checks passed."
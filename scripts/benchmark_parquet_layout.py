@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Parquet write settings: bytes written vs Trino point-lookup latency.
+
+For each layout variant, rebuilds marts.customers and marts.orders with dbt
+(overriding the models' parquet_options and cluster_by through the
+parquet_options_override / cluster_by_enabled vars), re-registers the tables,
+and then measures:
+  - bytes and data files written, from each table's Iceberg `$files` table;
+  - p50 / p95 latency and median physical input bytes of single-key lookups
+    (`WHERE customer_id = ?`, `WHERE order_id = ?`) for --lookups random keys.
+
+The tables are rebuilt with the project's own settings at the end, unless
+--no-restore is given. MinIO, the Iceberg REST catalog and Trino must be running.
+
+Usage:
+    python scripts/benchmark_parquet_layout.py [--lookups 50] [--variants zstd,zstd-clustered]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark_rollups import percentile
+from lakehouse_config import trino_connection
+
+# (schema, table, lookup key) measured for every variant.
+LOOKUP_TABLES = [
+    ("marts", "customers", "customer_id"),
+    ("marts", "orders", "order_id"),
+]
+
+# name → dbt vars. DuckDB's Parquet writer defaults to snappy and 122,880-row groups.
+VARIANTS = {
+    "snappy": {"parquet_options_override": {"compression": "snappy"}, "cluster_by_enabled": False},
+    "zstd": {"parquet_options_override": {"compression": "zstd", "compression_level": 3},
+             "cluster_by_enabled": False},
+    "zstd-clustered": {"parquet_options_override": {"compression": "zstd", "compression_level": 3},
+                       "cluster_by_enabled": True},
+    "zstd-clustered-small-row-groups": {
+        "parquet_options_override": {"compression": "zstd", "compression_level": 3, "row_group_size": 2048},
+        "cluster_by_enabled": True,
+    },
+    "zstd-clustered-bloom": {
+        "parquet_options_override": {"compression": "zstd", "compression_level": 3,
+                                     "dictionary_size_limit": 122880},
+        "cluster_by_enabled": True,
+    },
+    "zstd9-clustered": {"parquet_options_override": {"compression": "zstd", "compression_level": 9},
+                        "cluster_by_enabled": True},
+}
+
+
+def build(dbt_vars):
+    """Rebuild the lookup tables with dbt_vars (None = project settings) and re-register them."""
+    models = [table for _, table, _ in LOOKUP_TABLES]
+    command = ["dbt", "run", "-s", *models]
+    if dbt_vars is not None:
+        command += ["--vars", json.dumps(dbt_vars)]
+    for step in (command, [sys.executable, "scripts/register_iceberg_tables.py"]):
+        result = subprocess.run(step, capture_output=True, text=True)
+        if result.returncode:
+            print(result.stdout[-2000:])
+            print(result.stderr[-2000:])
+            sys.exit(f"{' '.join(step[:3])} failed (exit code {result.returncode})")
+
+
+def table_layout(cur, schema, table):
+    cur.execute(
+        "SELECT count(*), coalesce(sum(file_size_in_bytes), 0) "
+        f'FROM lakehouse.{schema}."{table}$files"'
+    )
+    files, size = cur.fetchone()
+    return files, size
+
+
+def lookup_latency(cur, schema, table, key, lookups):
+    """(latency samples in ms, median physical input bytes) for single-key lookups."""
+    cur.execute(f"SELECT {key} FROM lakehouse.{schema}.{table} ORDER BY random() LIMIT {lookups}")
+    keys = [row[0] for row in cur.fetchall()]
+    sql = f"SELECT * FROM lakehouse.{schema}.{table} WHERE {key} = {{}}"
+    cur.execute(sql.format(keys[0]))  # warm Trino metadata and plan caches before sampling
+    cur.fetchall()
+    samples, input_bytes = [], []
+    for value in keys:
+        start = time.perf_counter()
+        cur.execute(sql.format(value))
+        cur.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+        input_bytes.append((cur.stats or {}).get("physicalInputBytes") or 0)
+    return samples, statistics.median(input_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--lookups", type=int, default=50, help="random keys looked up per table")
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help=f"comma-separated subset of: {', '.join(VARIANTS)}")
+    parser.add_argument("--no-restore", action="store_true",
+                        help="leave the tables as written by the last variant")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.variants.split(",") if name.strip()]
+    unknown = [name for name in names if name not in VARIANTS]
+    if unknown:
+        sys.exit(f"Unknown variant(s): {', '.join(unknown)}")
+
+    cur = trino_connection().cursor()
+
+    print(f"{'variant':<34} {'table':<16} {'files':>5} {'KiB':>9} {'p50 ms':>8} {'p95 ms':>8} {'read KiB':>9}")
+    try:
+        for name in names:
+            build(VARIANTS[name])
+            for schema, table, key in LOOKUP_TABLES:
+                files, size = table_layout(cur, schema, table)
+                samples, input_bytes = lookup_latency(cur, schema, table, key, args.lookups)
+                print(
+                    f"{name:<34} {schema + '.' + table:<16} {files:>5} {size / 1024:>9.1f} "
+                    f"{statistics.median(samples):>8.1f} {percentile(samples, 95):>8.1f} "
+                    f"{input_bytes / 1024:>9.1f}"
+                )
+                name = ""
+    finally:
+        if not args.no_restore:
+            print("\nRestoring project Parquet settings...")
+            build(None)
+
+
+if __name__ == "__main__":
+    main()
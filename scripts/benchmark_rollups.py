@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Dashboard query latency: base table vs routed rollup.
+
+For every order chart in setup_superset.ORDER_CHARTS, runs the equivalent Trino
+query against marts.orders ("before") and against the rollup the chart is routed
+to ("after"), and prints median / p95 latency for each.
+
+Usage:
+    python scripts/benchmark_rollups.py [--runs 20]
+"""
+
+import argparse
+import statistics
+import time
+
+from lakehouse_config import trino_connection
+from setup_superset import BASE_ORDERS, ORDER_CHARTS, chart_sql, route_chart
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def time_query(cur, sql, runs):
+    cur.execute(sql)  # warm Trino metadata and plan caches before sampling
+    cur.fetchall()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per query")
+    args = parser.parse_args()
+
+    cur = trino_connection().cursor()
+
+    print(f"{'chart':<50} {'dataset':<24} {'p50 ms':>8} {'p95 ms':>8}")
+    for spec in ORDER_CHARTS:
+        target = route_chart(spec)
+        for label, dataset in (("before", BASE_ORDERS), ("after", target)):
+            samples = time_query(cur, chart_sql(dataset, spec), args.runs)
+            name = spec["name"] if label == "before" else ""
+            print(
+                f"{name:<50} {dataset['schema'] + '.' + dataset['table']:<24} "
+                f"{statistics.median(samples):>8.1f} {percentile(samples, 95):>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Answer contract checks from Iceberg column statistics instead of scanning data.
+
+Every data file entry in an Iceberg manifest carries `record_count`,
+`null_value_counts`, `lower_bounds` and `upper_bounds` per column. This script
+reads only the manifests (via PyIceberg and the REST catalog) and evaluates:
+
+  - row_count <op> n           exact from summed record_count
+  - missing_count(col) = n     exact from summed null_value_counts
+  - min(col) >= x / > x        passes if the smallest lower bound satisfies it
+  - max(col) <= y / < y        passes if the largest upper bound satisfies it
+
+Bounds are only guaranteed to enclose the data, not to be tight, so a min/max
+check that does not pass from bounds is inconclusive and falls back to a Trino
+query, as does any check on a table with delete files or missing stats.
+
+Checks come from the generated Soda files (soda/soda_checks_*.yml) plus the seed
+row counts in test_trino.EXPECTED_COUNTS. Exit 1 on any failure.
+"""
+
+import decimal
+import glob
+import operator
+import re
+import sys
+
+import yaml
+
+from lakehouse_config import rest_catalog
+from test_trino import EXPECTED_COUNTS, trino_query
+
+SODA_CONFIG = "soda/configuration.yml"
+SODA_CHECK_FILES = "soda/soda_checks_*.yml"
+
+CHECK_PATTERN = re.compile(
+    r"^(row_count|missing_count|min|max)(?:\((\w+)\))?\s*(>=|<=|=|>|<)\s*(-?\d+(?:\.\d+)?)$"
+)
+OPERATORS = {
+    "=": operator.eq, ">=": operator.ge, "<=": operator.le,
+    ">": operator.gt, "<": operator.lt,
+}
+
+PASS = "PASS"
+FAIL = "FAIL"
+failures = []
+
+
+def check(label, condition, source):
+    status = PASS if condition else FAIL
+    print(f"  [{status}] {label} ({source})")
+    if not condition:
+        failures.append(label)
+
+
+class TableStats:
+    """Column statistics aggregated over all live data files of a table snapshot."""
+
+    MISSING = object()
+
+    def __init__(self, table):
+        tasks = list(table.scan().plan_files())
+        fields = table.schema().fields
+        self.exact = all(not task.delete_files for task in tasks)
+        self.row_count = sum(task.file.record_count for task in tasks)
+        self.null_counts = {}
+        self.lower = {}
+        self.upper = {}
+
+        for field in fields:
+            nulls, lower, upper = 0, None, None
+            for task in tasks:
+                data_file = task.file
+                if data_file.record_count == 0:
+                    continue
+                file_nulls = (data_file.null_value_counts or {}).get(field.field_id)
+                nulls = None if nulls is None or file_nulls is None else nulls + file_nulls
+                lower = self._merge(lower, data_file.lower_bounds, field, min)
+                upper = self._merge(upper, data_file.upper_bounds, field, max)
+            self.null_counts[field.name] = nulls
+            self.lower[field.name] = None if lower is self.MISSING else lower
+            self.upper[field.name] = None if upper is self.MISSING else upper
+
+    def _merge(self, current, bounds, field, pick):
+        from pyiceberg.conversions import from_bytes  # deferred: load_checks() callers skip pyiceberg
+
+        # A single file without a bound makes the column's bound unknown.
+        if current is self.MISSING:
+            return current
+        raw = (bounds or {}).get(field.field_id)
+        if raw is None:
+            return self.MISSING
+        value = from_bytes(field.field_type, raw)
+        return value if current is None else pick(current, value)
+
+    def evaluate(self, metric, column, op, threshold):
+        """True/False when the stats decide the check, None when inconclusive."""
+        if not self.exact:
+            return None
+        compare = OPERATORS[op]
+        if metric == "row_count":
+            return compare(self.row_count, threshold)
+        if metric == "missing_count":
+            nulls = self.null_counts.get(column)
+            return None if nulls is None else compare(nulls, threshold)
+        if metric == "min" and op in (">=", ">"):
+            bound = self.lower.get(column)
+            return True if bound is not None and compare(bound, threshold) else None
+        if metric == "max" and op in ("<=", "<"):
+            bound = self.upper.get(column)
+            return True if bound is not None and compare(bound, threshold) else None
+        return None
+
+
+def fallback_query(schema, table, metric, column):
+    expression = {
+        "row_count": "count(*)",
+        "missing_count": f"count(*) - count({column})",
+        "min": f"min({column})",
+        "max": f"max({column})",
+    }[metric]
+    return trino_query(f"SELECT {expression} FROM lakehouse.{schema}.{table}")[0][0]
+
+
+def soda_check_files():
+    """{table: [SodaCL check items]} from the generated Soda files."""
+    tables = {}
+    for path in sorted(glob.glob(SODA_CHECK_FILES)):
+        with open(path) as f:
+            for key, items in yaml.safe_load(f).items():
+                tables.setdefault(key.removeprefix("checks for ").strip(), []).extend(items)
+    return tables
+
+
+def load_checks(from_contracts=False):
+    """[(schema, table, check expression, options)] from the Soda files and seed counts.
+
+    With from_contracts, the Soda checks are generated from the dbt contracts in
+    models/ instead of read from the files the last soda-gen step wrote.
+    """
+    with open(SODA_CONFIG) as f:
+        config = yaml.safe_load(f)
+    schema = next(iter(config.values()))["connection"]["schema"]
+
+    if from_contracts:
+        from generate_soda_from_dbt_contract import SODA_MODELS, contract_checks
+
+        tables = {model: contract_checks(path, model) for path, model in SODA_MODELS}
+    else:
+        tables = soda_check_files()
+    checks = []
+    for table, items in tables.items():
+        for item in items:
+            expression, options = next(iter(item.items()))
+            checks.append((schema, table, expression, options or {}))
+    for (schema_name, table), expected in EXPECTED_COUNTS.items():
+        checks.append((schema_name, table, f"row_count = {expected}", {}))
+    return checks
+
+
+def main():
+    catalog = rest_catalog()
+
+    stats = {}
+    from_stats = from_query = skipped = 0
+    current = None
+    for schema, table, expression, _ in load_checks():
+        if (schema, table) != current:
+            current = (schema, table)
+            print(f"\n-- {schema}.{table}")
+        match = CHECK_PATTERN.match(expression)
+        if not match:
+            # duplicate_count, invalid_percent, ...: not derivable from file stats.
+            print(f"  [skip] {expression} (needs a scan; left to Soda)")
+            skipped += 1
+            continue
+        metric, column, op, raw_threshold = match.groups()
+        threshold = decimal.Decimal(raw_threshold)
+
+        if (schema, table) not in stats:
+            stats[(schema, table)] = TableStats(catalog.load_table((schema, table)))
+        verdict = stats[(schema, table)].evaluate(metric, column, op, threshold)
+        if verdict is not None:
+            from_stats += 1
+            check(expression, verdict, "manifest stats")
+            continue
+
+        from_query += 1
+        try:
+            value = fallback_query(schema, table, metric, column)
+            check(expression, value is not None and OPERATORS[op](decimal.Decimal(str(value)), threshold),
+                  f"query, got {value}")
+        except Exception as e:
+            check(expression, False, f"query error: {e}")
+
+    print(f"\n{from_stats} check(s) answered from manifests, {from_query} by query, {skipped} skipped.")
+    if failures:
+        print(f"FAILED ({len(failures)} check(s)):")
+        for f in failures:
+            print(f"  - {f}")
+        sys.exit(1)
+    print("All checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Read-only HTTP lookup service for per-customer reads of the serving tables.
+
+Loads the current Iceberg snapshot of marts.customers and ddi.at_risk_customers
+straight from MinIO into memory, with no Trino and no query planning per request.
+Each table is held column by column (one list per column) with a customer_id →
+row position index. The current metadata file is located exactly as
+register_iceberg_tables.latest_metadata_key does: version-hint.text first, the
+newest *.metadata.json otherwise. It is read with DuckDB's iceberg_scan(), using
+the S3 settings from profiles.yml. With --cache, the Iceberg files are read
+through the local S3 file cache (s3_cache.py): a restart, or a reload after a
+build that rewrote only one table, serves unchanged files from disk.
+
+A background thread re-reads the metadata pointers every --poll seconds. When
+any of them changes (a dbt build wrote a new snapshot), the new snapshot is
+loaded off to the side and swapped in with a single assignment. Requests in
+flight finish against the snapshot they started with.
+
+Endpoints (JSON):
+    GET /customers/<customer_id>        one customer; 404 if unknown
+    GET /customers?ids=1,2,3            up to MAX_BATCH customers; unknown ids listed in "missing"
+    GET /health                         snapshot metadata keys, row counts, load time
+
+Usage:
+    python scripts/customer_lookup_service.py [--port 8099] [--poll 5] [--cache]
+    python scripts/customer_lookup_service.py --benchmark [--requests 5000] [--clients 8]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from lakehouse_config import BUCKET, s3_client
+from lakehouse_duckdb import profile_cache, profile_output, profile_session
+from register_iceberg_tables import latest_metadata_key
+
+# (response field, s3 prefix) of each table served, keyed by customer_id.
+SERVED_TABLES = [
+    ("customer", "customers.iceberg/"),
+    ("at_risk", "at_risk_customers.iceberg/"),
+]
+KEY = "customer_id"
+MAX_BATCH = 100
+
+
+class TableIndex:
+    """One table snapshot: a list per column plus a key → row position index."""
+
+    def __init__(self, names, rows):
+        self.names = names
+        self.columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in names]
+        self.positions = {key: i for i, key in enumerate(self.columns[names.index(KEY)])}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get(self, key):
+        i = self.positions.get(key)
+        if i is None:
+            return None
+        return {name: column[i] for name, column in zip(self.names, self.columns)}
+
+
+class Snapshot:
+    """The indexes of every served table, loaded from one set of metadata files."""
+
+    def __init__(self, metadata_keys, tables):
+        self.metadata_keys = metadata_keys
+        self.tables = tables
+        self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    def lookup(self, customer_id):
+        result = {KEY: customer_id}
+        for field, table in self.tables.items():
+            result[field] = table.get(customer_id)
+        return result if result["customer"] is not None else None
+
+
+class SnapshotLoader:
+    def __init__(self, cache=False):
+        self.s3 = s3_client()
+        output = profile_output()
+        self.cache = profile_cache(output) if cache else None
+        self.con = profile_session(output, cache=self.cache)
+        self.current = None
+
+    def metadata_keys(self):
+        return {field: latest_metadata_key(self.s3, prefix) for field, prefix in SERVED_TABLES}
+
+    def load(self, keys):
+        tables = {}
+        for field, key in keys.items():
+            cur = self.con.execute(f"SELECT * FROM iceberg_scan('s3://{BUCKET}/{key}')")
+            names = [column[0] for column in cur.description]
+            tables[field] = TableIndex(names, cur.fetchall())
+        return Snapshot(keys, tables)
+
+    def refresh(self):
+        """Load and swap in the latest snapshot if any metadata pointer moved; True if swapped."""
+        keys = self.metadata_keys()
+        if self.current is not None and keys == self.current.metadata_keys:
+            return False
+        snapshot = self.load(keys)
+        self.current = snapshot  # atomic swap; readers hold their own reference
+        counts = ", ".join(f"{field} {len(table)}" for field, table in snapshot.tables.items())
+        print(f"  loaded snapshot ({counts} rows) at {snapshot.loaded_at}")
+        if self.cache:
+            self.cache.save()
+            print(f"  {self.cache.summary()}")
+        return True
+
+    def poll(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"  [WARN] snapshot refresh failed, still serving {self.current.loaded_at}: {e}")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def make_handler(loader):
+    class LookupHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for CRM clients and the benchmark
+        # Headers and body go out as separate writes; with Nagle on, the body waits
+        # for the client's delayed ACK (~40 ms) on every keep-alive request.
+        disable_nagle_algorithm = True
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            snapshot = loader.current
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            try:
+                if parts == ["health"]:
+                    self.send_json(200, {
+                        "metadata": snapshot.metadata_keys,
+                        "rows": {field: len(table) for field, table in snapshot.tables.items()},
+                        "loaded_at": snapshot.loaded_at,
+                    })
+                elif len(parts) == 2 and parts[0] == "customers":
+                    found = snapshot.lookup(int(parts[1]))
+                    if found is None:
+                        self.send_json(404, {"error": f"unknown customer_id {parts[1]}"})
+                    else:
+                        self.send_json(200, found)
+                elif parts == ["customers"]:
+                    ids = [int(v) for v in parse_qs(url.query).get("ids", [""])[0].split(",") if v]
+                    if not ids or len(ids) > MAX_BATCH:
+                        self.send_json(400, {"error": f"pass 1 to {MAX_BATCH} ids as ?ids=1,2,3"})
+                        return
+                    found = [(i, snapshot.lookup(i)) for i in ids]
+                    self.send_json(200, {
+                        "customers": [row for _, row in found if row is not None],
+                        "missing": [i for i, row in found if row is None],
+                    })
+                else:
+                    self.send_json(404, {"error": "not found"})
+            except ValueError:
+                self.send_json(400, {"error": "customer ids must be integers"})
+
+        def log_message(self, format, *args):
+            pass  # one line per request would dominate the latency being served
+
+    return LookupHandler
+
+
+def benchmark(port, customer_ids, requests, clients, batch_size):
+    """Time single and batched lookups over keep-alive connections; prints p50/p95/p99."""
+    local = threading.local()
+
+    def get(path):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("localhost", port)
+        start = time.perf_counter()
+        local.conn.request("GET", path)
+        resp = local.conn.getresponse()
+        resp.read()
+        elapsed = (time.perf_counter() - start) * 1000
+        if resp.status != 200:
+            raise RuntimeError(f"GET {path} → HTTP {resp.status}")
+        return elapsed
+
+    workloads = [
+        ("single", lambda: f"/customers/{random.choice(customer_ids)}"),
+        (f"batch of {batch_size}", lambda: "/customers?ids=" + ",".join(
+            str(i) for i in random.sample(customer_ids, min(batch_size, len(customer_ids))))),
+    ]
+    print(f"\n{'workload':<14} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, make_path in workloads:
+        paths = [make_path() for _ in range(requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            samples = list(pool.map(get, paths))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<14} {requests:>8} {requests / elapsed:>9.0f} {statistics.median(samples):>8.2f} "
+            f"{percentile(samples, 95):>8.2f} {percentile(samples, 99):>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--port", type=int, default=8099, help="HTTP port (0 = any free port)")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between metadata pointer checks")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="start the service, measure lookup latency, and exit")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per benchmark workload")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent benchmark clients")
+    parser.add_argument("--batch-size", type=int, default=10, help="ids per batched benchmark request")
+    parser.add_argument("--cache", action="store_true",
+                        help="read Iceberg files through the local S3 file cache (s3_cache.py)")
+    args = parser.parse_args()
+
+    loader = SnapshotLoader(cache=args.cache)
+    start = time.perf_counter()
+    loader.refresh()
+    print(f"  initial load took {time.perf_counter() - start:.2f}s")
+    threading.Thread(target=loader.poll, args=(args.poll,), daemon=True).start()
+
+    server = ThreadingHTTPServer(("", 0 if args.benchmark else args.port), make_handler(loader))
+    server.daemon_threads = True
+    port = server.server_address[1]
+    if not args.benchmark:
+        print(f"Serving customer lookups on http://localhost:{port} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    customer_ids = list(loader.current.tables["customer"].positions)
+    benchmark(port, customer_ids, args.requests, args.clients, args.batch_size)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
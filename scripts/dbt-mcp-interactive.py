@@ -1,15 +1,194 @@
+"""
+Call dbt-mcp tools interactively (REPL) or from a JSONL batch file.
+
+    python scripts/dbt-mcp-interactive.py
+    python scripts/dbt-mcp-interactive.py --batch calls.jsonl [--concurrency 8] [--output results.jsonl]
+
+Batch lines look like {"tool": "get_node_details_dev", "args": {...}}.
+Consecutive calls to CONCURRENT_TOOLS (remote Discovery and Semantic Layer
+reads) run concurrently, bounded by --concurrency. A call to any other tool
+waits for the calls before it and runs alone, so file order is preserved across
+mutations. That includes the dbt CLI tools, even read-only ones: each runs dbt
+in the project and rewrites target/manifest.json and partial_parse.msgpack, so
+two at once would race on target/.
+
+Results of READ_ONLY_TOOLS are cached per (tool, args, manifest hash) in both
+modes. The hash is of target/manifest.json's contents: a CLI call that rewrites
+the manifest unchanged keeps the cache, a re-parse that changes it invalidates
+every cached result. Remote tools return dbt Cloud state the local manifest
+does not track, so they are never cached.
+"""
+
+import argparse
 import asyncio
+import hashlib
 import json
+import os
 import shlex
+import time
 
 from dbt_mcp.config.config import load_config
 from dbt_mcp.mcp.server import create_dbt_mcp
 
+MANIFEST_PATH = os.path.join(os.environ.get("DBT_PROJECT_DIR", "."), "target", "manifest.json")
+
+# Tools that only read the local project and target/manifest.json, so their
+# results stay valid until the manifest changes.
+READ_ONLY_TOOLS = frozenset({"list", "get_node_details_dev", "get_lineage_dev"})
+
+# Remote tools that only read dbt Cloud state and touch nothing local.
+CONCURRENT_TOOLS = frozenset({
+    "get_mart_models", "get_all_models", "get_model_details", "get_model_parents",
+    "get_model_children", "get_model_health", "get_all_sources", "get_exposures",
+    "get_exposure_details", "list_metrics", "get_dimensions", "get_entities",
+    "get_metrics_compiled_sql",
+})
+
+
+def is_read_only(tool_name):
+    return tool_name in READ_ONLY_TOOLS
+
+
+class ToolCache:
+    """Read-only tool results keyed by (tool, args, manifest hash)."""
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self._stat = None
+        self._hash = None
+        self._results = {}
+        self.hits = self.misses = 0
+
+    def manifest_hash(self):
+        """sha256 of the manifest, re-read only when its mtime or size changed."""
+        try:
+            stat = os.stat(self.manifest_path)
+            current = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            current = None
+        if current != self._stat:
+            # Every dbt CLI call rewrites the manifest, usually with the same contents.
+            self._stat = current
+            previous = self._hash
+            if current is None:
+                self._hash = None
+            else:
+                with open(self.manifest_path, "rb") as f:
+                    self._hash = hashlib.sha256(f.read()).hexdigest()
+            if self._hash != previous:
+                self._results.clear()  # entries keyed on the old contents can never match again
+        return self._hash
+
+    def key(self, tool_name, args):
+        return (tool_name, json.dumps(args, sort_keys=True), self.manifest_hash())
+
+    def get(self, key):
+        """The cached (or in-flight) future for key, or None after recording a miss."""
+        if key in self._results:
+            self.hits += 1
+            return self._results[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, future):
+        if key[2] is not None:
+            self._results[key] = future
+
+    def discard(self, key):
+        self._results.pop(key, None)
 
-async def main():
-    config = load_config()
-    dbt_mcp = await create_dbt_mcp(config)
 
+def parse_args(args_str):
+    """Parse key=value pairs; values are JSON when they parse, else strings."""
+    args = {}
+    for arg in shlex.split(args_str):
+        if "=" in arg:
+            key, value = arg.split("=", 1)
+            # Try to parse as JSON, otherwise keep as string
+            try:
+                args[key] = json.loads(value)
+            except json.JSONDecodeError:
+                args[key] = value
+        else:
+            print(f"Invalid argument format: {arg}. Use key=value")
+    return args
+
+
+def result_text(result):
+    return "\n".join(content.text if hasattr(content, "text") else str(content) for content in result)
+
+
+async def call_tool(dbt_mcp, cache, tool_name, args):
+    """Return (result, cached, seconds), serving read-only tools from the cache.
+
+    Concurrent identical read-only calls share one in-flight request.
+    """
+    start = time.perf_counter()
+    key = cache.key(tool_name, args) if is_read_only(tool_name) else None
+    if key is None:
+        result = await dbt_mcp.call_tool(tool_name, args)
+        return result, False, time.perf_counter() - start
+
+    future = cache.get(key)
+    if future is not None:
+        return await future, True, time.perf_counter() - start
+    future = asyncio.get_running_loop().create_future()
+    cache.put(key, future)
+    try:
+        result = await dbt_mcp.call_tool(tool_name, args)
+    except Exception as e:
+        cache.discard(key)  # errors are not cached; waiters see this one
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    future.set_result(result)
+    return result, False, time.perf_counter() - start
+
+
+async def run_batch(dbt_mcp, cache, path, concurrency, output):
+    with open(path) as f:
+        calls = [json.loads(line) for line in f if line.strip()]
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(calls)
+
+    async def run_one(i, call):
+        async with semaphore:
+            try:
+                result, cached, seconds = await call_tool(dbt_mcp, cache, call["tool"], call.get("args", {}))
+                results[i] = {"tool": call["tool"], "args": call.get("args", {}), "cached": cached,
+                              "seconds": seconds, "result": result_text(result)}
+            except Exception as e:
+                results[i] = {"tool": call["tool"], "args": call.get("args", {}), "cached": False,
+                              "seconds": None, "error": str(e)}
+        status = "error" if "error" in results[i] else ("cached" if results[i]["cached"] else "ok")
+        seconds_text = f"{results[i]['seconds'] * 1000:8.1f} ms" if results[i]["seconds"] is not None else f"{'-':>11}"
+        print(f"  [{i + 1:>4}] {seconds_text}  {status:<6} {call['tool']} {json.dumps(call.get('args', {}))}")
+
+    start = time.perf_counter()
+    pending = []
+    for i, call in enumerate(calls):
+        if call["tool"] in CONCURRENT_TOOLS:
+            pending.append(asyncio.create_task(run_one(i, call)))
+            continue
+        # dbt CLI or mutating call: a barrier between the calls before and after it.
+        await asyncio.gather(*pending)
+        pending = []
+        await run_one(i, call)
+    await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for r in results if "error" in r)
+    total = sum(r["seconds"] for r in results if r["seconds"] is not None)
+    print(f"\n{len(calls)} call(s) in {elapsed:.2f}s wall ({total:.2f}s summed), "
+          f"{cache.hits} cache hit(s), {cache.misses} miss(es), {errors} error(s)")
+    if output:
+        with open(output, "w") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+    return errors
+
+
+async def repl(dbt_mcp, cache):
     # List available tools
     tools = await dbt_mcp.list_tools()
     print("Available tools:")
@@ -35,31 +214,12 @@ async def main():
             if not parts:
                 continue
             tool_name = parts[0]
-            args_str = " ".join(parts[1:])
-
-            # Parse arguments as key=value pairs
-            args = {}
-            if args_str:
-                for arg in shlex.split(args_str):
-                    if "=" in arg:
-                        key, value = arg.split("=", 1)
-                        # Try to parse as JSON, otherwise keep as string
-                        try:
-                            args[key] = json.loads(value)
-                        except json.JSONDecodeError:
-                            args[key] = value
-                    else:
-                        print(f"Invalid argument format: {arg}. Use key=value")
-                        continue
+            args = parse_args(" ".join(parts[1:]))
 
             print(f"Calling {tool_name} with {args}")
-            result = await dbt_mcp.call_tool(tool_name, args)
-            print("Result:")
-            for content in result:
-                if hasattr(content, 'text'):
-                    print(content.text)
-                else:
-                    print(content)
+            result, cached, seconds = await call_tool(dbt_mcp, cache, tool_name, args)
+            print(f"Result ({seconds * 1000:.1f} ms{', cached' if cached else ''}):")
+            print(result_text(result))
             print()
 
         except KeyboardInterrupt:
@@ -70,5 +230,22 @@ async def main():
             print()
 
 
+async def main():
+    parser = argparse.ArgumentParser(description="Call dbt-mcp tools interactively or in batch.")
+    parser.add_argument("--batch", metavar="JSONL", help="run the tool calls in this file and exit")
+    parser.add_argument("--concurrency", type=int, default=8, help="max concurrent calls in batch mode")
+    parser.add_argument("--output", metavar="JSONL", help="write batch results here")
+    args = parser.parse_args()
+
+    config = load_config()
+    dbt_mcp = await create_dbt_mcp(config)
+    cache = ToolCache()
+
+    if args.batch:
+        errors = await run_batch(dbt_mcp, cache, args.batch, args.concurrency, args.output)
+        raise SystemExit(1 if errors else 0)
+    await repl(dbt_mcp, cache)
+
+
 if __name__ == "__main__":
     asyncio.run(main())
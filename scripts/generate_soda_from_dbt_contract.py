@@ -1,10 +1,37 @@
+import re
 import yaml
 import sys
 
-def main(contract_path="models/ddi/schema.yml", model_name="rolling_30_day_orders", output_path="soda_checks_rolling_30_day_orders.yml", datasource_name="jaffle_shop_datasource", table_name="dbt_ddi.rolling_30_day_orders"):
+VAR_PATTERN = re.compile(r"""^\{\{\s*var\(\s*['"](\w+)['"]\s*\)\s*\}\}$""")
+
+
+def load_project_vars(project_path="dbt_project.yml"):
+    with open(project_path) as f:
+        return yaml.safe_load(f).get("vars", {})
+
+
+def resolve_var(value, project_vars):
+    """Resolve a `{{ var('name') }}` test argument to its dbt_project.yml value."""
+    if isinstance(value, str):
+        match = VAR_PATTERN.match(value.strip())
+        if match:
+            return project_vars[match.group(1)]
+    return value
+
+
+# (contract file, model) pairs that get a soda/soda_checks_<model>.yml
+SODA_MODELS = [
+    ("models/ddi/schema.yml", "rolling_30_day_orders"),
+    ("models/ddi/schema.yml", "at_risk_customers"),
+]
+
+
+def contract_checks(contract_path, model_name):
+    """SodaCL check items for the column tests in a model's dbt contract."""
     with open(contract_path) as f:
         schema = yaml.safe_load(f)
 
+    project_vars = load_project_vars()
     models = schema["models"]
     model = next((m for m in models if m["name"] == model_name), None)
     if not model:
@@ -60,8 +87,8 @@ def main(contract_path="models/ddi/schema.yml", model_name="rolling_30_day_order
                     }
                 )
             elif "dbt_expectations.expect_column_values_to_be_between" == test_name:
-                min_value = test_args.get("min_value")
-                max_value = test_args.get("max_value")
+                min_value = resolve_var(test_args.get("min_value"), project_vars)
+                max_value = resolve_var(test_args.get("max_value"), project_vars)
                 if min_value is not None:
                     checks.append(
                         {
@@ -78,7 +105,11 @@ def main(contract_path="models/ddi/schema.yml", model_name="rolling_30_day_order
                             }
                         }
                     )
+    return checks
 
+
+def main(contract_path="models/ddi/schema.yml", model_name="rolling_30_day_orders", output_path="soda_checks_rolling_30_day_orders.yml", datasource_name="jaffle_shop_datasource", table_name="dbt_ddi.rolling_30_day_orders"):
+    checks = contract_checks(contract_path, model_name)
     sodacl_yaml = {
         f"checks for {table_name}": checks,
     }
@@ -90,18 +121,17 @@ def main(contract_path="models/ddi/schema.yml", model_name="rolling_30_day_order
 
     print(f"Generated {output_path} with {len(checks)} checks for model {model_name}")
 
-if __name__ == "__main__":
+
+def generate_all():
     # Table names are unqualified; catalog and schema are set in soda/configuration.yml
-    main(
-        contract_path="models/ddi/schema.yml",
-        model_name="rolling_30_day_orders",
-        output_path="soda/soda_checks_rolling_30_day_orders.yml",
-        table_name="rolling_30_day_orders"
-    )
-
-    main(
-        contract_path="models/ddi/schema.yml",
-        model_name="at_risk_customers",
-        output_path="soda/soda_checks_at_risk_customers.yml",
-        table_name="at_risk_customers"
-    )
\ No newline at end of file
+    for contract_path, model_name in SODA_MODELS:
+        main(
+            contract_path=contract_path,
+            model_name=model_name,
+            output_path=f"soda/soda_checks_{model_name}.yml",
+            table_name=model_name
+        )
+
+
+if __name__ == "__main__":
+    generate_all()
@@ -0,0 +1,34 @@
+"""
+dbt-duckdb plugin: publish each external iceberg model to the REST catalog as
+soon as the materialization has written it.
+
+Enabled per model with `+plugin: iceberg_catalog` (dbt_project.yml); the
+external materialization calls store() after the COPY. The plugin finds the
+snapshot DuckDB just wrote (version-hint.text) and commits it through
+iceberg_commit.commit_snapshot(), so Trino serves the new data when the model
+finishes rather than after a separate registration step.
+
+Off unless LAKEHOUSE_CATALOG_COMMIT=true (profiles.yml), so builds without it
+need neither the REST catalog nor pyiceberg/boto3, which are imported only on
+the first commit. run_checks.sh sets it except under --local-only;
+register_iceberg_tables.py publishes tables built without it.
+"""
+
+from dbt.adapters.duckdb.plugins import BasePlugin
+
+from iceberg_commit import commit_snapshot
+from lakehouse_config import BUCKET, rest_catalog, s3_client
+from register_iceberg_tables import latest_metadata_key
+
+
+class Plugin(BasePlugin):
+    def initialize(self, plugin_config):
+        self.enabled = str(plugin_config.get("enabled", "true")).lower() not in ("false", "0", "no")
+
+    def store(self, target_config):
+        if not self.enabled or target_config.location.format != "iceberg":
+            return
+        relation = target_config.relation
+        prefix = target_config.location.path.split(f"s3://{BUCKET}/", 1)[1].rstrip("/") + "/"
+        key = latest_metadata_key(s3_client(), prefix)
+        commit_snapshot(rest_catalog(), (relation.schema, relation.identifier), f"s3://{BUCKET}/{key}")
@@ -0,0 +1,107 @@
+"""
+Publish a DuckDB-written Iceberg snapshot through the REST catalog's commit path.
+
+DuckDB's metadata files are not valid for the REST catalog's registerTable:
+they lack `last-sequence-number` and have empty `sort-orders`. Instead of
+patching and re-uploading them, commit_snapshot() reads DuckDB's snapshot
+in memory (PyIceberg StaticTable; both omissions are tolerated on read). It
+then commits the snapshot's data files to the catalog table as one overwrite
+transaction.
+
+The catalog writes its own spec-compliant metadata under
+s3://<bucket>/catalog/<namespace>/<table>/. DuckDB's files are never modified,
+and Trino switches from the previous snapshot to the new one atomically at
+commit.
+
+The catalog table is created from the DuckDB snapshot's schema and partition
+spec, and re-created when either changes. Committing the same data files again
+is a no-op.
+
+Used by the external materialization at write time (iceberg_catalog_plugin.py)
+and by register_iceberg_tables.py.
+"""
+
+from lakehouse_config import BUCKET, S3_PROPERTIES
+
+CATALOG_ROOT = f"s3://{BUCKET}/catalog"
+
+
+def layout(table):
+    """Field ids, names, types and partition fields: what data files must agree on."""
+    fields = [(f.field_id, f.name, str(f.field_type), f.required) for f in table.schema().fields]
+    spec = [(f.source_id, f.field_id, str(f.transform), f.name) for f in table.spec().fields]
+    return fields, spec
+
+
+def ensure_namespace(catalog, namespace):
+    from pyiceberg.exceptions import NamespaceAlreadyExistsError
+
+    try:
+        catalog.create_namespace(namespace)
+        print(f"  created namespace '{namespace}'")
+    except NamespaceAlreadyExistsError:
+        pass
+
+
+def catalog_table(catalog, identifier, source):
+    """The catalog table for identifier, (re-)created if its layout differs from source.
+
+    Tables registered in place over DuckDB's metadata (before commits went through
+    the catalog) are re-created under CATALOG_ROOT as well.
+    """
+    from pyiceberg.exceptions import NoSuchTableError
+
+    namespace, name = identifier
+    location = f"{CATALOG_ROOT}/{namespace}/{name}"
+    try:
+        table = catalog.load_table(identifier)
+    except NoSuchTableError:
+        table = None
+    if table is not None:
+        if table.location().rstrip("/") == location and layout(table) == layout(source):
+            return table
+        print("  schema, partitioning or location changed: re-creating catalog table")
+        catalog.drop_table(identifier)
+
+    ensure_namespace(catalog, namespace)
+    table = catalog.create_table(
+        identifier,
+        schema=source.schema(),
+        partition_spec=source.spec(),
+        location=location,
+        properties={"format-version": "2"},
+    )
+    if layout(table) != layout(source):
+        # The catalog assigns fresh field ids; data files are read by id.
+        catalog.drop_table(identifier)
+        raise ValueError(
+            f"{namespace}.{name}: catalog assigned field ids {layout(table)} that do not match "
+            f"the DuckDB-written files {layout(source)}"
+        )
+    return table
+
+
+def commit_snapshot(catalog, identifier, metadata_location):
+    """Make the catalog table identifier serve the data files of the DuckDB snapshot
+    at metadata_location. Returns the number of data files, or None if unchanged."""
+    from pyiceberg.table import StaticTable
+
+    source = StaticTable.from_metadata(metadata_location, properties=S3_PROPERTIES)
+    new_files = [task.file for task in source.scan().plan_files()]
+
+    table = catalog_table(catalog, identifier, source)
+    if table.current_snapshot() is None:
+        old_files = []
+    else:
+        old_files = [task.file for task in table.scan().plan_files()]
+        if {f.file_path for f in old_files} == {f.file_path for f in new_files}:
+            return None
+
+    with table.transaction() as tx:
+        update = tx.update_snapshot(snapshot_properties={"duckdb-metadata-location": metadata_location})
+        with update.overwrite() as overwrite:
+            for data_file in old_files:
+                overwrite.delete_data_file(data_file)
+            for data_file in new_files:
+                overwrite.append_data_file(data_file)
+    return len(new_files)
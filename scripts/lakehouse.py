@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+One entry point for the lakehouse pipeline scripts.
+
+Subcommands are chained with `+` and run in order in one process, stopping at
+the first that fails:
+
+    python scripts/lakehouse.py register + test-trino + soda-gen
+    python scripts/lakehouse.py superset-setup --index-cache target/superset_index.json + superset-test --repeat 5
+
+Each subcommand runs the script's own entry point with the arguments that follow
+it, so `lakehouse.py superset-test --help` shows test_superset.py's options. A
+script's module is imported only when its subcommand runs, so `--help` is
+instant. Endpoints and the S3, Iceberg REST and Trino clients come from
+lakehouse_config and are created once per process, then shared by every
+subcommand in the chain.
+
+Each subcommand runs in its own tracing span, so under run_checks.sh the trace
+still breaks the chain down per step.
+"""
+
+import importlib
+import sys
+import time
+
+from tracing import span
+
+# subcommand → (module, entry point, summary)
+SUBCOMMANDS = {
+    "setup-minio": ("setup_minio", "main", "create the lakehouse bucket in MinIO"),
+    "register": ("register_iceberg_tables", "main", "commit dbt-written Iceberg tables to the REST catalog"),
+    "test-trino": ("test_trino", "main", "Trino + Iceberg integration tests"),
+    "reconcile": ("reconcile_tables", "main", "hash-compare the build output with the tables Trino serves"),
+    "soda-gen": ("generate_soda_from_dbt_contract", "generate_all", "generate Soda checks from dbt contracts"),
+    "superset-setup": ("setup_superset", "main", "provision Superset datasets, charts and dashboards"),
+    "superset-test": ("test_superset", "main", "Superset → Trino → Iceberg smoke tests"),
+}
+
+
+def usage():
+    lines = [__doc__.strip(), "", "Subcommands:"]
+    lines += [f"  {name:<16} {summary}" for name, (_, _, summary) in SUBCOMMANDS.items()]
+    return "\n".join(lines)
+
+
+def split_chain(argv):
+    """['a', '-x', '+', 'b'] → [('a', ['-x']), ('b', [])]"""
+    chain, current = [], []
+    for arg in argv + ["+"]:
+        if arg != "+":
+            current.append(arg)
+            continue
+        if not current:
+            sys.exit(f"Empty subcommand in chain; choose from: {', '.join(SUBCOMMANDS)}")
+        name, args = current[0], current[1:]
+        if name not in SUBCOMMANDS:
+            sys.exit(f"Unknown subcommand: {name}; choose from: {', '.join(SUBCOMMANDS)}")
+        chain.append((name, args))
+        current = []
+    return chain
+
+
+def run(name, args):
+    """Run one subcommand in-process; returns its exit code."""
+    module_name, entry_point, _ = SUBCOMMANDS[name]
+    saved_argv = sys.argv
+    sys.argv = [f"lakehouse.py {name}", *args]
+    with span(name, command=" ".join(sys.argv)) as s:
+        try:
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            s.set("import_seconds", round(time.perf_counter() - start, 3))
+            getattr(module, entry_point)()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+        finally:
+            sys.argv = saved_argv
+        s.set("exit_code", code)
+        if code:
+            s.error = f"exit code {code}"
+    return code
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print(usage())
+        return
+    chain = split_chain(sys.argv[1:])
+    for i, (name, args) in enumerate(chain):
+        if len(chain) > 1:
+            print(f"\n==> {name}" + (f" {' '.join(args)}" if args else ""))
+        start = time.perf_counter()
+        code = run(name, args)
+        if len(chain) > 1:
+            print(f"<== {name}: {'ok' if code == 0 else f'exit code {code}'} in {time.perf_counter() - start:.1f}s")
+        if code:
+            skipped = [n for n, _ in chain[i + 1:]]
+            if skipped:
+                print(f"Skipping {', '.join(skipped)}.")
+            sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
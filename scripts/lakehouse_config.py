@@ -0,0 +1,74 @@
+"""
+Endpoints, credentials and shared clients for the lakehouse scripts.
+
+Every endpoint can be overridden from the environment (LAKEHOUSE_MINIO_ENDPOINT,
+LAKEHOUSE_TRINO_HOST, ...); the defaults match docker-compose.yml.
+
+The client factories import boto3 / pyiceberg / trino only when first called and
+return one instance per process, so scripts run back to back by scripts/lakehouse.py
+share the same connection pools and pay each import once.
+"""
+
+import functools
+import os
+
+MINIO_ENDPOINT = os.environ.get("LAKEHOUSE_MINIO_ENDPOINT", "http://localhost:9000")
+MINIO_ACCESS_KEY = os.environ.get("LAKEHOUSE_MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.environ.get("LAKEHOUSE_MINIO_SECRET_KEY", "minioadmin")
+BUCKET = os.environ.get("LAKEHOUSE_BUCKET", "lakehouse")
+
+REST_CATALOG_URI = os.environ.get("LAKEHOUSE_REST_CATALOG_URI", "http://localhost:8181")
+
+TRINO_HOST = os.environ.get("LAKEHOUSE_TRINO_HOST", "localhost")
+TRINO_PORT = int(os.environ.get("LAKEHOUSE_TRINO_PORT", "8080"))
+TRINO_USER = os.environ.get("LAKEHOUSE_TRINO_USER", "trino_user")
+
+SUPERSET_URL = os.environ.get("LAKEHOUSE_SUPERSET_URL", "http://localhost:8088")
+
+S3_MAX_POOL_CONNECTIONS = 16
+
+# PyIceberg FileIO properties for reading and writing table files on MinIO.
+S3_PROPERTIES = {
+    "s3.endpoint": MINIO_ENDPOINT,
+    "s3.access-key-id": MINIO_ACCESS_KEY,
+    "s3.secret-access-key": MINIO_SECRET_KEY,
+    "s3.path-style-access": "true",
+    "s3.region": "us-east-1",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def s3_client():
+    """boto3 S3 client for MinIO, traced (tracing.instrument_boto3)."""
+    import boto3
+    from botocore.client import Config
+
+    from tracing import instrument_boto3
+
+    return instrument_boto3(boto3.client(
+        "s3",
+        endpoint_url=MINIO_ENDPOINT,
+        aws_access_key_id=MINIO_ACCESS_KEY,
+        aws_secret_access_key=MINIO_SECRET_KEY,
+        config=Config(signature_version="s3v4", max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+        region_name="us-east-1",
+    ))
+
+
+@functools.lru_cache(maxsize=None)
+def rest_catalog():
+    """PyIceberg client for the Iceberg REST catalog, able to read table files on MinIO."""
+    from pyiceberg.catalog.rest import RestCatalog
+
+    return RestCatalog("lakehouse", uri=REST_CATALOG_URI, **S3_PROPERTIES)
+
+
+@functools.lru_cache(maxsize=None)
+def trino_connection():
+    """Trino DB-API connection to the `lakehouse` catalog; open one cursor per thread."""
+    import trino
+
+    return trino.dbapi.connect(
+        host=TRINO_HOST, port=TRINO_PORT,
+        user=TRINO_USER, http_scheme="http",
+    )
@@ -0,0 +1,95 @@
+"""
+In-process DuckDB sessions configured like the dbt profile's target.
+
+profile_output() reads the active output from profiles.yml; profile_session()
+opens DuckDB with its extensions and httpfs/S3 settings, or reads s3:// through
+the local file cache (s3_cache.py) when given one. connect() adds an in-memory
+`lakehouse` catalog with one iceberg_scan view per table, so the Trino SQL in
+test_trino runs unchanged.
+
+Shared by validate_local.py, reconcile_tables.py, sharded_build.py and
+customer_lookup_service.py. profiles.yml is found next to scripts/, so the
+service runs from any directory. boto3 and fsspec are imported only when a cache
+is used.
+"""
+
+import os
+
+import duckdb
+import yaml
+
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles.yml")
+PROFILE_NAME = "jaffle_shop"
+
+
+def profile_output(path=PROFILES_PATH, profile=PROFILE_NAME):
+    with open(path) as f:
+        config = yaml.safe_load(f)[profile]
+    return config["outputs"][config["target"]]
+
+
+def sql_literal(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def profile_s3_client(output):
+    """boto3 client for the S3 endpoint and credentials in the profile's httpfs settings."""
+    import boto3  # only the --cache path talks to S3 outside DuckDB
+
+    settings = output.get("settings", {})
+    scheme = "https" if settings.get("s3_use_ssl", True) else "http"
+    return boto3.client(
+        "s3",
+        endpoint_url=f"{scheme}://{settings['s3_endpoint']}",
+        aws_access_key_id=settings["s3_access_key_id"],
+        aws_secret_access_key=settings["s3_secret_access_key"],
+        region_name=settings.get("s3_region", "us-east-1"),
+    )
+
+
+def profile_cache(output):
+    """S3Cache over the profile's S3 endpoint, for the --cache option of the DuckDB readers."""
+    from s3_cache import S3Cache  # fsspec is only needed with a cache
+
+    return S3Cache(profile_s3_client(output))
+
+
+def profile_session(output, database=":memory:", cache=None):
+    """DuckDB session on database with the profile's extensions and settings.
+
+    With a cache, s3:// is served by CachedS3FileSystem and httpfs is not loaded.
+    """
+    con = duckdb.connect(database)
+    for extension in output.get("extensions", []):
+        if cache and extension == "httpfs":
+            continue
+        con.execute(f"INSTALL {extension}")
+        con.execute(f"LOAD {extension}")
+    for key, value in output.get("settings", {}).items():
+        if cache and key.startswith("s3_"):
+            continue
+        con.execute(f"SET GLOBAL {key} = {sql_literal(value)}")
+    if cache:
+        from s3_cache import CachedS3FileSystem  # fsspec is only needed with a cache
+
+        con.register_filesystem(CachedS3FileSystem(cache))
+    return con
+
+
+def connect(output, tables, cache=None):
+    """In-memory profile_session() plus a lakehouse.<schema>.<table> view per (schema, table)."""
+    con = profile_session(output, cache=cache)
+    root = output["external_root"].rstrip("/")
+    con.execute("ATTACH ':memory:' AS lakehouse")
+    for schema in sorted({schema for schema, _ in tables}):
+        con.execute(f"CREATE SCHEMA lakehouse.{schema}")
+    for schema, table in tables:
+        con.execute(
+            f"CREATE VIEW lakehouse.{schema}.{table} AS "
+            f"SELECT * FROM iceberg_scan('{root}/{table}.iceberg')"
+        )
+    return con
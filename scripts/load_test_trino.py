@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user load generator for the Trino/Iceberg serving path.
+
+Replays a weighted mix of the dashboard chart queries (superset/charts.yml, via
+setup_superset.dashboard_queries) and the business-invariant SQL from
+test_trino.py against Trino from N concurrent clients for a fixed duration, then
+reports throughput and p50/p95/p99 latency per query.
+
+Usage:
+    python scripts/load_test_trino.py --clients 16 --duration 60
+    python scripts/load_test_trino.py --clients 32 --dashboard-weight 4 --invariant-weight 1 \\
+        --json load_results.json
+
+Use --json to keep results and compare runs across Trino sizing, model or layout
+changes. Exit 1 if any query errored.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import trino
+
+from lakehouse_config import TRINO_HOST, TRINO_PORT, TRINO_USER
+from setup_superset import dashboard_queries
+from test_trino import INVARIANTS
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def query_mix(dashboard_weight, invariant_weight):
+    """[(label, sql, weight)] for the configured mix."""
+    mix = [(f"chart: {name}", sql, dashboard_weight) for name, sql in dashboard_queries()]
+    mix += [(f"invariant: {label}", sql, invariant_weight) for label, sql, _ in INVARIANTS]
+    return [q for q in mix if q[2] > 0]
+
+
+def client_loop(mix, deadline, warmup_until, results, errors, lock, seed):
+    rng = random.Random(seed)
+    labels = [q[0] for q in mix]
+    sqls = {q[0]: q[1] for q in mix}
+    weights = [q[2] for q in mix]
+    # One connection per client: the load test measures concurrent sessions.
+    conn = trino.dbapi.connect(
+        host=TRINO_HOST, port=TRINO_PORT,
+        user=TRINO_USER, http_scheme="http",
+    )
+    cur = conn.cursor()
+    while time.time() < deadline:
+        label = rng.choices(labels, weights)[0]
+        start = time.perf_counter()
+        try:
+            cur.execute(sqls[label])
+            cur.fetchall()
+        except Exception as e:
+            with lock:
+                errors[label].append(str(e)[:200])
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if time.time() >= warmup_until:
+            with lock:
+                results[label].append(elapsed_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent dashboard-query load test against Trino.")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent Trino clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--dashboard-weight", type=int, default=3, help="relative weight of each chart query")
+    parser.add_argument("--invariant-weight", type=int, default=1, help="relative weight of each invariant query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write per-query results as JSON")
+    args = parser.parse_args()
+
+    mix = query_mix(args.dashboard_weight, args.invariant_weight)
+    results = defaultdict(list)
+    errors = defaultdict(list)
+    lock = threading.Lock()
+    warmup_until = time.time() + args.warmup
+    deadline = warmup_until + args.duration
+
+    print(f"==> {args.clients} clients, {len(mix)} queries, "
+          f"{args.warmup:.0f}s warm-up + {args.duration:.0f}s measured")
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(mix, deadline, warmup_until, results, errors, lock, args.seed + i),
+            daemon=True,
+        )
+        for i in range(args.clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = sum(len(v) for v in results.values())
+    print(f"\nThroughput: {total / args.duration:.1f} queries/s ({total} queries)\n")
+    print(f"{'query':<72} {'n':>6} {'qps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>4}")
+    report = {"clients": args.clients, "duration_s": args.duration, "qps": total / args.duration, "queries": {}}
+    for label, _, _ in mix:
+        samples = results.get(label, [])
+        n_err = len(errors.get(label, []))
+        row = {"n": len(samples), "qps": len(samples) / args.duration, "errors": n_err}
+        if samples:
+            row.update(
+                p50_ms=statistics.median(samples),
+                p95_ms=percentile(samples, 95),
+                p99_ms=percentile(samples, 99),
+            )
+            print(f"{label[:72]:<72} {row['n']:>6} {row['qps']:>7.2f} {row['p50_ms']:>8.1f} "
+                  f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {n_err:>4}")
+        else:
+            print(f"{label[:72]:<72} {0:>6} {0:>7.2f} {'-':>8} {'-':>8} {'-':>8} {n_err:>4}")
+        report["queries"][label] = row
+
+    for label, messages in errors.items():
+        print(f"\n[error] {label}: {messages[0]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
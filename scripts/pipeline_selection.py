@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+State-aware selection for `run_checks.sh --changed`.
+
+dbt compares the current project with the manifest saved by the last
+successful run (STATE_DIR) and selects `state:modified+`: every node whose SQL,
+config or contract changed, plus everything downstream of it. `select` writes
+that selection to SELECTION_PATH. run_checks.sh then exports the file's path as
+PIPELINE_SELECTION, and each later stage reads it through selected_tables():
+
+  - register_iceberg_tables.py commits only the selected tables
+  - validate_local.py and test_trino.py run only the checks that read them
+  - validate_contracts gets the selected models (`models` prints its --args)
+  - Soda scans run only for selected tables (`selected` exit code)
+  - setup_superset.py warms up only the charts that read them
+
+With PIPELINE_SELECTION unset, every stage runs in full as before.
+
+Usage:
+    python scripts/pipeline_selection.py select                 # write target/selection.json
+    python scripts/pipeline_selection.py selected ddi.at_risk_customers   # exit 0 if selected
+    python scripts/pipeline_selection.py models                 # validate_contracts --args
+    python scripts/pipeline_selection.py save                   # after a successful run
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from functools import lru_cache
+
+STATE_DIR = "target/last_run_state"
+SELECTION_PATH = "target/selection.json"
+MANIFEST_PATH = "target/manifest.json"
+SELECTOR = "state:modified+"
+
+TABLE_REFERENCE = re.compile(r"\blakehouse\.(\w+)\.(\w+)")
+
+
+@lru_cache(maxsize=None)
+def load_selection():
+    """The selection written by `select`, or None when PIPELINE_SELECTION is unset."""
+    path = os.environ.get("PIPELINE_SELECTION")
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def selected_tables():
+    """{(schema, table)} of the selected lakehouse tables, or None for a full run."""
+    selection = load_selection()
+    if selection is None:
+        return None
+    return {tuple(t) for t in selection["tables"]}
+
+
+def is_selected(schema, table):
+    tables = selected_tables()
+    return tables is None or (schema, table) in tables
+
+
+def reads_selected(sql):
+    """True if sql reads any selected lakehouse.<schema>.<table> (always, for a full run)."""
+    return any(is_selected(schema, table) for schema, table in TABLE_REFERENCE.findall(sql))
+
+
+def restricted_note(total):
+    """One line describing the selection for a stage's output, or "" for a full run."""
+    tables = selected_tables()
+    if tables is None:
+        return ""
+    return f"(restricted to {len(tables)} of {total} table(s) changed since the last run: PIPELINE_SELECTION)"
+
+
+def select(state_dir=STATE_DIR, output_path=SELECTION_PATH):
+    """Resolve state:modified+ against state_dir with `dbt ls` and write output_path."""
+    result = subprocess.run(
+        ["dbt", "--quiet", "ls", "--select", SELECTOR, "--state", state_dir, "--output", "json"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"dbt ls failed:\n{result.stdout}{result.stderr}")
+    nodes = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+
+    models = [n for n in nodes if n["resource_type"] == "model"]
+    selection = {
+        "selector": SELECTOR,
+        "state": state_dir,
+        "nodes": sorted(n["unique_id"] for n in nodes),
+        "models": sorted(n["name"] for n in models),
+        # Only external models are written to the lakehouse; views stay in DuckDB.
+        "tables": sorted(
+            [n["config"]["schema"], n.get("alias") or n["name"]]
+            for n in models if n["config"].get("materialized") == "external"
+        ),
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(selection, f, indent=2)
+
+    print(f"{SELECTOR} against {state_dir}: {len(nodes)} node(s), {len(models)} model(s)")
+    for schema, table in selection["tables"]:
+        print(f"  {schema}.{table}")
+    return selection
+
+
+def save(state_dir=STATE_DIR, manifest_path=MANIFEST_PATH):
+    """Keep the current manifest as the baseline for the next --changed run."""
+    os.makedirs(state_dir, exist_ok=True)
+    shutil.copy2(manifest_path, os.path.join(state_dir, "manifest.json"))
+    print(f"Saved {manifest_path} → {state_dir}/manifest.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("select", help=f"resolve {SELECTOR} and write the selection file")
+    p.add_argument("--state", default=STATE_DIR)
+    p.add_argument("--output", default=SELECTION_PATH)
+    p = sub.add_parser("selected", help="exit 0 if any (or each given) schema.table is selected")
+    p.add_argument("tables", nargs="*", metavar="SCHEMA.TABLE")
+    sub.add_parser("models", help="print validate_contracts --args for the selected models")
+    p = sub.add_parser("save", help="save the current manifest as the next run's state")
+    p.add_argument("--state", default=STATE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "select":
+        select(args.state, args.output)
+    elif args.command == "selected":
+        selection = load_selection()
+        if args.tables:
+            ok = all(is_selected(*t.split(".", 1)) for t in args.tables)
+        else:
+            ok = selection is None or bool(selection["nodes"])
+        sys.exit(0 if ok else 1)
+    elif args.command == "models":
+        selection = load_selection()
+        print(json.dumps({} if selection is None else {"models": selection["models"]}))
+    elif args.command == "save":
+        save(args.state)
+
+
+if __name__ == "__main__":
+    main()
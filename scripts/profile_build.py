@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Per-model, per-phase build profile of the last dbt invocation.
+
+Combines:
+  - target/run_results.json: status and execution time of every node (models,
+    seeds, tests), so views like stg_* show up too;
+  - main.dbt_build_profile in the dbt DuckDB database: create_table /
+    write_iceberg / main / swap timings recorded by the external materialization;
+  - target/query_profile__<model>__<phase>.json (dbt build --vars
+    '{profile_queries: true}'): the slowest operators of DuckDB's query profile.
+
+Every run is appended to a JSON-lines history file. A model or phase is flagged
+as a regression when it is both --threshold times slower than its median over
+the previous --baseline runs and at least --min-seconds slower in absolute terms.
+
+Usage:
+    dbt build && python scripts/profile_build.py
+    python scripts/profile_build.py --fail-on-regression   # exit 1 on regression (CI)
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+
+import duckdb
+import yaml
+
+RUN_RESULTS = "target/run_results.json"
+QUERY_PROFILES = "target/query_profile__*__*.json"
+HISTORY = "build_profile_history.jsonl"
+PHASES = ["create_table", "write_iceberg", "main", "swap"]
+
+
+def dbt_database_path(path="profiles.yml", profile="jaffle_shop"):
+    with open(path) as f:
+        config = yaml.safe_load(f)[profile]
+    return config["outputs"][config["target"]]["path"]
+
+
+def load_run_results(path=RUN_RESULTS):
+    with open(path) as f:
+        run = json.load(f)
+    nodes = {
+        r["unique_id"]: {"status": r["status"], "seconds": r["execution_time"]}
+        for r in run["results"]
+    }
+    return run["metadata"]["invocation_id"], run["metadata"].get("generated_at"), nodes
+
+
+def load_phases(db_path, invocation_id):
+    """unique_id → {phase: seconds} for one invocation (empty if not recorded)."""
+    try:
+        con = duckdb.connect(db_path, read_only=True)
+    except duckdb.Error as e:
+        print(f"  [skip] phase timings: cannot open {db_path} ({e})")
+        return {}
+    try:
+        rows = con.execute(
+            "SELECT unique_id, phase, sum(seconds) FROM main.dbt_build_profile "
+            "WHERE invocation_id = ? GROUP BY 1, 2",
+            [invocation_id],
+        ).fetchall()
+    except duckdb.CatalogException:
+        rows = []
+    finally:
+        con.close()
+    phases = {}
+    for unique_id, phase, seconds in rows:
+        phases.setdefault(unique_id, {})[phase] = seconds
+    return phases
+
+
+def operator_timings(node, found):
+    """Walk a DuckDB JSON profile tree (key names differ across DuckDB versions)."""
+    name = node.get("operator_name") or node.get("operator_type") or node.get("name")
+    timing = node.get("operator_timing", node.get("timing"))
+    if name and timing is not None:
+        found.append((timing, name.strip()))
+    for child in node.get("children", []):
+        operator_timings(child, found)
+    return found
+
+
+def load_query_profiles(pattern=QUERY_PROFILES, top=3):
+    """model name → [(phase, [(seconds, operator)] slowest first)]"""
+    profiles = {}
+    for path in sorted(glob.glob(pattern)):
+        match = re.match(r"query_profile__(\w+?)__(\w+)\.json$", os.path.basename(path))
+        if not match:
+            continue
+        with open(path) as f:
+            tree = json.load(f)
+        slowest = sorted(operator_timings(tree, []), reverse=True)[:top]
+        profiles.setdefault(match.group(1), []).append((match.group(2), slowest))
+    return profiles
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def regressions(record, history, baseline, threshold, min_seconds):
+    """[(key, seconds, median)] for models/phases slower than their recent median."""
+    previous = [r for r in history if r["invocation_id"] != record["invocation_id"]][-baseline:]
+    found = []
+    for key, seconds in record["timings"].items():
+        samples = [r["timings"][key] for r in previous if key in r["timings"]]
+        if len(samples) < 2:
+            continue
+        median = statistics.median(samples)
+        if seconds > median * threshold and seconds - median >= min_seconds:
+            found.append((key, seconds, median))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--history", default=HISTORY, help="JSON-lines run history")
+    parser.add_argument("--baseline", type=int, default=10, help="previous runs to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown factor vs median")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="minimum absolute slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args()
+
+    invocation_id, generated_at, nodes = load_run_results()
+    phases = load_phases(dbt_database_path(), invocation_id)
+    query_profiles = load_query_profiles()
+
+    models = sorted(
+        ((uid, r) for uid, r in nodes.items() if uid.startswith(("model.", "seed."))),
+        key=lambda item: item[1]["seconds"], reverse=True,
+    )
+    build_total = sum(r["seconds"] for _, r in models) or 1.0
+
+    print(f"-- Build profile (invocation {invocation_id})")
+    header = "".join(f" {p:>13}" for p in PHASES)
+    print(f"  {'node':<42} {'status':<8} {'total s':>8} {'share':>6}{header}")
+    for uid, result in models:
+        node_phases = phases.get(uid, {})
+        cells = "".join(
+            f" {node_phases[p]:>13.2f}" if p in node_phases else f" {'-':>13}" for p in PHASES
+        )
+        print(
+            f"  {uid.split('.', 1)[1]:<42} {result['status']:<8} {result['seconds']:>8.2f} "
+            f"{100 * result['seconds'] / build_total:>5.0f}%{cells}"
+        )
+
+    tests = [r["seconds"] for uid, r in nodes.items() if uid.startswith("test.")]
+    if tests:
+        print(f"  {'(' + str(len(tests)) + ' tests)':<42} {'':<8} {sum(tests):>8.2f}")
+
+    if query_profiles:
+        print("\n-- Slowest DuckDB operators (query profiles)")
+        for model, entries in query_profiles.items():
+            for phase, slowest in entries:
+                ops = ", ".join(f"{name} {seconds:.2f}s" for seconds, name in slowest)
+                print(f"  {model + ' / ' + phase:<50} {ops}")
+
+    timings = {}
+    for uid, result in models:
+        timings[uid] = result["seconds"]
+        for phase, seconds in phases.get(uid, {}).items():
+            timings[f"{uid}:{phase}"] = seconds
+    record = {"invocation_id": invocation_id, "generated_at": generated_at, "timings": timings}
+
+    history = load_history(args.history)
+    found = regressions(record, history, args.baseline, args.threshold, args.min_seconds)
+    if not any(r["invocation_id"] == invocation_id for r in history):
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    print(f"\n-- Regressions vs median of last {args.baseline} run(s) in {args.history}")
+    if not found:
+        print("  [PASS] no model or phase regressed")
+        return
+    for key, seconds, median in found:
+        print(f"  [FAIL] {key}: {seconds:.2f}s vs median {median:.2f}s ({seconds / median:.1f}x)")
+    if args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
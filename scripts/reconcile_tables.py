@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Reconcile serving tables between the dbt build output and Trino with row hashes.
+
+test_trino.py compares row counts, which a stale snapshot of the same size
+passes. This script checks full content equality without transferring rows:
+
+  1. Every row is rendered to the same canonical text in DuckDB and Trino
+     (types are formatted explicitly). md5 of the table's key columns gives a
+     60-bit key hash that places the row in a bucket. md5 of the whole row gives
+     two 60-bit row-hash halves.
+  2. One aggregate query per side returns count(*) and the sums of both halves
+     for each key-hash bucket. Sums ignore row order and file layout, so a
+     bucket's digests match when it holds the same rows. The build side is
+     DuckDB reading the Iceberg table dbt just wrote (iceberg_scan, as in
+     validate_local.py). The served side is Trino reading the snapshot committed
+     to the REST catalog.
+  3. Mismatching buckets are bisected. Each round splits them 16 ways on the
+     next key-hash bits and compares the digests again, until a bucket holds at
+     most --leaf-rows rows. Only those rows' keys and hashes are fetched and
+     diffed into missing, extra and changed keys.
+
+A matching table costs one scan per side. Every bisection round re-reads the
+build side's Iceberg files; with --cache they come from the local S3 file cache
+(s3_cache.py) after the first round. Under `run_checks.sh --changed` only
+the tables selected by state:modified+ are reconciled (pipeline_selection.py).
+Exit 1 if any table differs.
+
+Usage:
+    python scripts/reconcile_tables.py
+    python scripts/reconcile_tables.py --tables marts.orders --buckets 1024
+    python scripts/reconcile_tables.py --cache
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+
+from lakehouse_duckdb import connect, profile_cache, profile_output
+from pipeline_selection import is_selected
+from test_trino import EXPECTED_TABLES, trino_query
+from tracing import ThreadPoolExecutor, span
+
+# Columns identifying a row; bisection reports differences by these.
+TABLE_KEYS = {
+    ("marts", "customers"): ["customer_id"],
+    ("marts", "orders"): ["order_id"],
+    ("ddi", "rolling_30_day_orders"): ["order_date"],
+    ("ddi", "at_risk_customers"): ["customer_id"],
+    ("ddi", "rolling_order_metrics"): ["grain", "period_start"],
+    ("ddi", "customer_recency_cohorts"): ["customer_id"],
+    ("rollups", "orders_daily"): ["period_start", "status"],
+    ("rollups", "orders_weekly"): ["period_start", "status"],
+    ("rollups", "orders_monthly"): ["period_start", "status"],
+}
+
+HASH_BITS = 60  # 15 hex digits of md5: fits a signed BIGINT in both engines
+FANOUT_BITS = 4  # each bisection round splits a bucket 16 ways
+MAX_BUCKETS = 4096  # stop bisecting when more buckets than this differ
+MAX_KEYS_SHOWN = 10
+
+# Same text for every supported type in both engines; NULL and '' stay distinct.
+TEXT_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "DATE", "BOOLEAN", "VARCHAR")
+
+DIALECTS = {
+    "duckdb": {
+        "md5": "md5({})",
+        "hex60": "('0x' || substr({}, {}, 15))::BIGINT",
+        "shift": "({} >> {})",
+        "timestamp": "epoch_ms({})",
+        "timestamptz": "epoch_ms({})",
+    },
+    "trino": {
+        "md5": "lower(to_hex(md5(to_utf8({}))))",
+        "hex60": "from_base(substr({}, {}, 15), 16)",
+        "shift": "bitwise_right_shift({}, {})",
+        "timestamp": "date_diff('millisecond', TIMESTAMP '1970-01-01 00:00:00', {})",
+        "timestamptz": "date_diff('millisecond', TIMESTAMP '1970-01-01 00:00:00 UTC', {})",
+    },
+}
+
+PASS = "PASS"
+FAIL = "FAIL"
+
+
+def render(column, column_type, dialect):
+    """SQL rendering column as canonical text (NULL stays NULL)."""
+    sql = f'"{column}"'
+    column_type = column_type.upper()
+    if column_type.startswith("TIMESTAMP"):
+        # Epoch milliseconds: Trino has no microsecond date_diff or format, so
+        # sub-millisecond differences are not detected.
+        kind = "timestamptz" if "TIME ZONE" in column_type else "timestamp"
+        return f"CAST({DIALECTS[dialect][kind].format(sql)} AS VARCHAR)"
+    if column_type in ("DOUBLE", "FLOAT", "REAL"):
+        return f"CAST(CAST({sql} AS DECIMAL(38, 9)) AS VARCHAR)"
+    if column_type in TEXT_TYPES or column_type.startswith(("DECIMAL", "VARCHAR")):
+        return f"CAST({sql} AS VARCHAR)"
+    raise ValueError(f"{column}: no canonical text rendering for {column_type}")
+
+
+def canonical_row(columns, dialect):
+    """One string per row: every column prefixed 'v' (or 'n' for NULL), joined by \\x1f."""
+    parts = [f"coalesce('v' || {render(name, column_type, dialect)}, 'n')" for name, column_type in columns]
+    return f"concat_ws(chr(31), {', '.join(parts)})"
+
+
+class Side:
+    """One engine's view of a table: hashed rows and digest/leaf queries over them."""
+
+    def __init__(self, name, query, schema, table, columns, keys):
+        self.name = name
+        self.query = query
+        d = DIALECTS[name]
+        types = dict(columns)
+        key_columns = [(k, types[k]) for k in keys]
+        key_text = ", ".join(f"{render(k, t, name)} AS \"key_{k}\"" for k, t in key_columns)
+        self.keys = [f'"key_{k}"' for k in keys]
+        self.shift = d["shift"]
+        self.hashed = (
+            "(SELECT "
+            f"{d['hex60'].format('key_md5', 1)} AS k, "
+            f"{d['hex60'].format('row_md5', 1)} AS h1, "
+            f"{d['hex60'].format('row_md5', 16)} AS h2, "
+            f"{', '.join(self.keys)} "
+            "FROM (SELECT "
+            f"{d['md5'].format(canonical_row(key_columns, name))} AS key_md5, "
+            f"{d['md5'].format(canonical_row(columns, name))} AS row_md5, "
+            f"{key_text} "
+            f"FROM lakehouse.{schema}.{table}) rendered) hashed"
+        )
+
+    def bucket_filter(self, shift, buckets):
+        if buckets is None:
+            return ""
+        return f" WHERE {self.shift.format('k', shift)} IN ({', '.join(map(str, buckets))})"
+
+    def digests(self, shift, parent_shift=None, parents=None):
+        """bucket → (rows, sum h1, sum h2) for the buckets of width 2**shift."""
+        bucket = self.shift.format("k", shift)
+        rows = self.query(
+            f"SELECT {bucket}, count(*), sum(CAST(h1 AS DECIMAL(38, 0))), sum(CAST(h2 AS DECIMAL(38, 0))) "
+            f"FROM {self.hashed}{self.bucket_filter(parent_shift, parents)} GROUP BY 1"
+        )
+        return {b: (int(n), int(s1), int(s2)) for b, n, s1, s2 in rows}
+
+    def leaf_rows(self, shift, buckets):
+        """Counter of (key tuple, h1, h2) for every row in the given buckets."""
+        rows = self.query(f"SELECT {', '.join(self.keys)}, h1, h2 FROM {self.hashed}{self.bucket_filter(shift, buckets)}")
+        return Counter((tuple(row[:-2]), row[-2], row[-1]) for row in rows)
+
+
+def both(pool, build, served, method, *args):
+    """Run the same query on both sides concurrently."""
+    futures = [pool.submit(getattr(side, method), *args) for side in (build, served)]
+    return [f.result() for f in futures]
+
+
+def differing(build_digests, served_digests):
+    return sorted(b for b in build_digests.keys() | served_digests.keys()
+                  if build_digests.get(b) != served_digests.get(b))
+
+
+def diff_keys(build_rows, served_rows):
+    """(missing, extra, changed) key lists: only in the build, only in Trino, or both but different."""
+    only_build = build_rows - served_rows
+    only_served = served_rows - build_rows
+    build_keys = {key for key, _, _ in only_build}
+    served_keys = {key for key, _, _ in only_served}
+    return (sorted(build_keys - served_keys), sorted(served_keys - build_keys),
+            sorted(build_keys & served_keys))
+
+
+def reconcile(pool, duck, schema, table, buckets, leaf_rows):
+    """Returns (ok, summary lines)."""
+    keys = TABLE_KEYS[(schema, table)]
+    columns = [(row[0], row[1]) for row in duck.execute(f"DESCRIBE lakehouse.{schema}.{table}").fetchall()]
+
+    def duck_query(sql):
+        cursor = duck.cursor()  # one cursor per thread over the same database
+        try:
+            return cursor.execute(sql).fetchall()
+        finally:
+            cursor.close()
+
+    build = Side("duckdb", duck_query, schema, table, columns, keys)
+    served = Side("trino", trino_query, schema, table, columns, keys)
+
+    shift = HASH_BITS - (buckets.bit_length() - 1)
+    build_digests, served_digests = both(pool, build, served, "digests", shift)
+    build_count = sum(n for n, _, _ in build_digests.values())
+    served_count = sum(n for n, _, _ in served_digests.values())
+    mismatched = differing(build_digests, served_digests)
+    if not mismatched:
+        return True, [f"{build_count} rows, {len(build_digests)} non-empty bucket(s) match"]
+
+    lines = [f"{len(mismatched)} of {buckets} bucket(s) differ (build {build_count} rows, "
+             f"Trino {served_count} rows)"]
+    rounds = 1
+    while shift > 0:
+        largest = max(max(build_digests.get(b, (0,))[0], served_digests.get(b, (0,))[0]) for b in mismatched)
+        if largest <= leaf_rows:
+            break
+        if len(mismatched) > MAX_BUCKETS:
+            lines.append(f"{len(mismatched)} bucket(s) differ after {rounds} round(s): too many to bisect")
+            return False, lines
+        parent_shift, shift = shift, max(shift - FANOUT_BITS, 0)
+        build_digests, served_digests = both(pool, build, served, "digests", shift, parent_shift, mismatched)
+        mismatched = differing(build_digests, served_digests)
+        rounds += 1
+
+    build_rows, served_rows = both(pool, build, served, "leaf_rows", shift, mismatched)
+    missing, extra, changed = diff_keys(build_rows, served_rows)
+    lines.append(f"bisected to {len(mismatched)} bucket(s) in {rounds} round(s): "
+                 f"{len(missing)} missing in Trino, {len(extra)} only in Trino, {len(changed)} changed")
+    for label, found in (("missing in Trino", missing), ("only in Trino", extra), ("changed", changed)):
+        for key in found[:MAX_KEYS_SHOWN]:
+            lines.append(f"  {label}: " + ", ".join(f"{k}={v}" for k, v in zip(keys, key)))
+        if len(found) > MAX_KEYS_SHOWN:
+            lines.append(f"  {label}: ... {len(found) - MAX_KEYS_SHOWN} more")
+    return False, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--tables", nargs="+", metavar="SCHEMA.TABLE",
+                        help="tables to reconcile (default: every serving table)")
+    parser.add_argument("--buckets", type=int, default=256,
+                        help="key-hash buckets compared in the first round (power of two)")
+    parser.add_argument("--leaf-rows", type=int, default=1000,
+                        help="bisect until each differing bucket holds at most this many rows")
+    parser.add_argument("--cache", action="store_true",
+                        help="read the build side through the local Iceberg file cache (s3_cache.py)")
+    args = parser.parse_args()
+    if args.buckets < 1 or args.buckets & (args.buckets - 1):
+        parser.error("--buckets must be a power of two")
+
+    tables = [(s, t) for s, t in EXPECTED_TABLES if is_selected(s, t)]
+    if args.tables:
+        tables = [tuple(name.split(".", 1)) for name in args.tables]
+        unknown = [".".join(t) for t in tables if t not in TABLE_KEYS]
+        if unknown:
+            parser.error(f"no TABLE_KEYS entry for {', '.join(unknown)}")
+
+    output = profile_output()
+    cache = profile_cache(output) if args.cache else None
+    duck = connect(output, EXPECTED_TABLES, cache)
+    failures = []
+    print("-- Hash reconciliation: DuckDB build output vs Trino")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for schema, table in tables:
+            start = time.perf_counter()
+            with span("reconcile table", table=f"{schema}.{table}") as s:
+                try:
+                    ok, lines = reconcile(pool, duck, schema, table, args.buckets, args.leaf_rows)
+                except Exception as e:
+                    ok, lines = False, [str(e)]
+                if not ok:
+                    s.error = lines[0]
+            label = f"{schema}.{table}"
+            print(f"  [{PASS if ok else FAIL}] {label}: {lines[0]} ({time.perf_counter() - start:.1f}s)")
+            for line in lines[1:]:
+                print(f"      {line}")
+            if not ok:
+                failures.append(label)
+
+    print()
+    if cache:
+        cache.save()
+        print(cache.summary())
+    if failures:
+        print(f"FAILED ({len(failures)} table(s)):")
+        for f in failures:
+            print(f"  - {f}")
+        sys.exit(1)
+    print("All tables match.")
+
+
+if __name__ == "__main__":
+    main()
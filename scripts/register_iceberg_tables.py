@@ -1,52 +1,45 @@
 """
-Register dbt-written Iceberg tables in the REST catalog so Trino can query them.
+Publish dbt-written Iceberg tables in the REST catalog so Trino can query them.
 
-Run after every `dbt build`:
-    python register_iceberg_tables.py
+With LAKEHOUSE_CATALOG_COMMIT=true the external materialization already does
+this per model at write time (iceberg_catalog_plugin.py). This script does it
+for every table at once, e.g. after a build without it or after resetting the
+catalog:
+    python scripts/register_iceberg_tables.py
+
+Under `run_checks.sh --changed` only the tables selected by state:modified+ are
+committed (pipeline_selection.py).
 
 How it works:
-  1. Scans MinIO for Iceberg metadata files written by DuckDB.
-  2. Patches missing `last-sequence-number` (DuckDB omits it; REST catalog requires it).
-  3. Calls the Iceberg REST catalog's `registerTable` endpoint (PyIceberg).
+  1. Finds each table's current DuckDB metadata file on MinIO (version-hint.text).
+  2. Commits that snapshot's data files to the catalog table through the REST
+     catalog's commit path (iceberg_commit.commit_snapshot); tables already
+     serving those files are left alone.
 
 The S3 warehouse path convention (set by `external_root` in profiles.yml):
-  s3://lakehouse/<schema>/<model_name>/
+  s3://lakehouse/<model_name>.iceberg/
 """
 
-import json
-import re
-import boto3
-from botocore.client import Config
-from pyiceberg.catalog.rest import RestCatalog
-
-MINIO_ENDPOINT = "http://localhost:9000"
-MINIO_ACCESS_KEY = "minioadmin"
-MINIO_SECRET_KEY = "minioadmin"
-BUCKET = "lakehouse"
-
-REST_CATALOG_URI = "http://localhost:8181"
+from iceberg_commit import commit_snapshot
+from lakehouse_config import BUCKET, rest_catalog, s3_client
+from pipeline_selection import is_selected, restricted_note
+from tracing import span
 
 # (iceberg_namespace, model_name, s3_prefix)
 # dbt-duckdb external materialization writes to <external_root>/<model>.iceberg/
 TABLES = [
-    ("marts", "customers",             "customers.iceberg/"),
-    ("marts", "orders",                "orders.iceberg/"),
-    ("ddi",   "rolling_30_day_orders", "rolling_30_day_orders.iceberg/"),
-    ("ddi",   "at_risk_customers",     "at_risk_customers.iceberg/"),
+    ("marts", "customers",                "customers.iceberg/"),
+    ("marts", "orders",                   "orders.iceberg/"),
+    ("ddi",   "rolling_30_day_orders",    "rolling_30_day_orders.iceberg/"),
+    ("ddi",   "at_risk_customers",        "at_risk_customers.iceberg/"),
+    ("ddi",   "rolling_order_metrics",    "rolling_order_metrics.iceberg/"),
+    ("ddi",   "customer_recency_cohorts", "customer_recency_cohorts.iceberg/"),
+    ("rollups", "orders_daily",           "orders_daily.iceberg/"),
+    ("rollups", "orders_weekly",          "orders_weekly.iceberg/"),
+    ("rollups", "orders_monthly",         "orders_monthly.iceberg/"),
 ]
 
 
-def s3_client():
-    return boto3.client(
-        "s3",
-        endpoint_url=MINIO_ENDPOINT,
-        aws_access_key_id=MINIO_ACCESS_KEY,
-        aws_secret_access_key=MINIO_SECRET_KEY,
-        config=Config(signature_version="s3v4"),
-        region_name="us-east-1",
-    )
-
-
 def latest_metadata_key(s3, prefix):
     # version-hint.text is the authoritative pointer to the current metadata file.
     # DuckDB writes UUID-named metadata files and sets this hint after each build.
@@ -68,85 +61,28 @@ def latest_metadata_key(s3, prefix):
     return max(candidates, key=lambda o: o["LastModified"])["Key"]
 
 
-def patch_and_upload(s3, key):
-    """Fix DuckDB Iceberg metadata omissions before REST catalog registration.
-
-    DuckDB omits `last-sequence-number` and writes `sort-orders: []` (empty),
-    both of which are rejected by the Iceberg REST catalog.
-    """
-    obj = s3.get_object(Bucket=BUCKET, Key=key)
-    meta = json.loads(obj["Body"].read())
-    changed = False
-
-    if "last-sequence-number" not in meta:
-        sequences = [
-            snap.get("sequence-number", 0)
-            for snap in meta.get("snapshots", [])
-        ]
-        meta["last-sequence-number"] = max(sequences, default=0)
-        print(f"    patched last-sequence-number → {meta['last-sequence-number']}")
-        changed = True
-
-    if not meta.get("sort-orders"):
-        meta["sort-orders"] = [{"order-id": 0, "fields": []}]
-        print("    patched sort-orders → [{order-id: 0, fields: []}]")
-        changed = True
-
-    if changed:
-        s3.put_object(
-            Bucket=BUCKET,
-            Key=key,
-            Body=json.dumps(meta).encode(),
-            ContentType="application/json",
-        )
-    return f"s3://{BUCKET}/{key}"
-
-
-def ensure_namespace(catalog, namespace):
-    try:
-        catalog.create_namespace(namespace)
-        print(f"  created namespace '{namespace}'")
-    except Exception:
-        pass  # already exists
-
-
 def main():
     s3 = s3_client()
-    catalog = RestCatalog(
-        "lakehouse",
-        **{
-            "uri": REST_CATALOG_URI,
-            "s3.endpoint": MINIO_ENDPOINT,
-            "s3.access-key-id": MINIO_ACCESS_KEY,
-            "s3.secret-access-key": MINIO_SECRET_KEY,
-            "s3.path-style-access": "true",
-            "s3.region": "us-east-1",
-        },
-    )
-
-    for namespace, table, prefix in TABLES:
-        print(f"\n{namespace}.{table}")
-        try:
-            key = latest_metadata_key(s3, prefix)
-            metadata_location = patch_and_upload(s3, key)
-            print(f"  metadata → {metadata_location}")
+    catalog = rest_catalog()
+    tables = [t for t in TABLES if is_selected(t[0], t[1])]
+    if restricted_note(len(TABLES)):
+        print(restricted_note(len(TABLES)))
 
-            ensure_namespace(catalog, namespace)
-
-            # Drop if already registered (idempotent re-run after dbt rebuild).
+    for namespace, table, prefix in tables:
+        print(f"\n{namespace}.{table}")
+        with span("register table", table=f"{namespace}.{table}") as table_span:
             try:
-                catalog.drop_table((namespace, table))
-                print("  dropped stale registration")
-            except Exception:
-                pass
-
-            catalog.register_table((namespace, table), metadata_location)
-            print("  registered OK")
-
-        except FileNotFoundError as e:
-            print(f"  SKIP (not yet written): {e}")
-        except Exception as e:
-            print(f"  ERROR: {e}")
+                metadata_location = f"s3://{BUCKET}/{latest_metadata_key(s3, prefix)}"
+                print(f"  metadata → {metadata_location}")
+                with span("iceberg-rest commit"):
+                    files = commit_snapshot(catalog, (namespace, table), metadata_location)
+                print("  already current" if files is None else f"  committed {files} data file(s)")
+
+            except FileNotFoundError as e:
+                print(f"  SKIP (not yet written): {e}")
+            except Exception as e:
+                table_span.error = str(e)
+                print(f"  ERROR: {e}")
 
     print("\nDone — Trino can now query via catalog 'lakehouse'.")
 
@@ -0,0 +1,225 @@
+"""
+Read-through, content-addressed disk cache for Iceberg files on S3/MinIO.
+
+Every cached object is stored under sha256(bucket/key + ETag), so a rewritten
+object (e.g. version-hint.text, rewritten on every build) gets
+a new entry instead of serving stale bytes. Data files and manifests (.parquet,
+.avro) are never rewritten by Iceberg, so their ETag is remembered in an index
+and a hit costs no request at all; any other key costs one HEAD. The cache is
+LRU-evicted by total size. The LRU order and total size are kept in memory,
+loaded once from the entries' atimes; an entry's atime is bumped on every hit so
+the next process starts from the same order, while its mtime is left as the
+download time and reported to readers as the file's modified time.
+
+    s3 = boto3.client("s3", ...)
+    cache = S3Cache(s3)
+    body = cache.read("lakehouse", "orders.iceberg/metadata/v1.metadata.json")
+    print(cache.summary())
+
+CachedS3FileSystem exposes the same cache as an fsspec filesystem for the `s3`
+protocol, so an in-process DuckDB session (con.register_filesystem) reads Iceberg
+metadata, manifests and Parquet through it instead of httpfs. The DuckDB readers
+take it with --cache: validate_local.py, reconcile_tables.py (build side) and
+customer_lookup_service.py.
+
+It is read-only, so it is not registered in dbt builds: DuckDB would send their
+COPY ... TO s3:// writes to it too. iceberg_commit.py reads through PyIceberg's
+own FileIO, and only files DuckDB has just written, which would all be misses.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from fsspec.implementations.local import LocalFileOpener
+from fsspec.spec import AbstractFileSystem
+
+CACHE_DIR = os.environ.get("LAKEHOUSE_CACHE_DIR", os.path.expanduser("~/.cache/lakehouse-s3"))
+MAX_BYTES = int(os.environ.get("LAKEHOUSE_CACHE_MAX_BYTES", 2 * 1024**3))
+
+# Iceberg writes these once under unique names and never modifies them.
+IMMUTABLE_SUFFIXES = (".parquet", ".avro")
+
+
+class S3Cache:
+    def __init__(self, s3, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.s3 = s3
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self.bytes_fetched = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(cache_dir, "etags.json")
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._etags = {}  # "bucket/key" → ETag, immutable keys only
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._etags = json.load(f)
+        self._lru, self._total = self._load_entries()
+
+    def _load_entries(self):
+        """(OrderedDict path → size, least recently used first; total bytes) from disk."""
+        entries = []
+        for root, _, files in os.walk(os.path.join(self.cache_dir, "objects")):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    full = os.path.join(root, name)
+                    stat = os.stat(full)
+                    entries.append((stat.st_atime, full, stat.st_size))
+        lru = OrderedDict((full, size) for _, full, size in sorted(entries))
+        return lru, sum(lru.values())
+
+    def _touch(self, path, size):
+        """Mark path most recently used, adding it if another process wrote it."""
+        with self._lock:
+            if path not in self._lru:
+                self._total += size
+            self._lru[path] = size
+            self._lru.move_to_end(path)
+
+    def _entry_path(self, bucket, key, etag):
+        digest = hashlib.sha256(f"{bucket}/{key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def etag(self, bucket, key):
+        ident = f"{bucket}/{key}"
+        immutable = key.endswith(IMMUTABLE_SUFFIXES)
+        if immutable and ident in self._etags:
+            return self._etags[ident]
+        etag = self.s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+        if immutable:
+            with self._lock:
+                self._etags[ident] = etag
+        return etag
+
+    def path(self, bucket, key):
+        """Local path holding the current bytes of s3://bucket/key, fetching on a miss."""
+        etag = self.etag(bucket, key)
+        path = self._entry_path(bucket, key, etag)
+        if os.path.exists(path):
+            # LRU: eviction removes the least recently used entries, by atime
+            stat = os.stat(path)
+            os.utime(path, (time.time(), stat.st_mtime))
+            self._touch(path, stat.st_size)
+            with self._lock:
+                self.hits += 1
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        self.s3.download_file(bucket, key, tmp)
+        os.replace(tmp, path)  # atomic: concurrent readers never see a partial file
+        size = os.path.getsize(path)
+        self._touch(path, size)
+        with self._lock:
+            self.misses += 1
+            self.bytes_fetched += size
+        self._evict(keep=path)
+        return path
+
+    def read(self, bucket, key):
+        with open(self.path(bucket, key), "rb") as f:
+            return f.read()
+
+    def _evict(self, keep):
+        """Drop least recently used entries until under max_bytes, never `keep`."""
+        with self._lock:
+            victims = []
+            for full in self._lru:
+                if self._total <= self.max_bytes:
+                    break
+                if full != keep:
+                    victims.append(full)
+                    self._total -= self._lru[full]
+            for full in victims:
+                del self._lru[full]
+            self.evictions += len(victims)
+        for full in victims:
+            try:
+                os.remove(full)
+            except FileNotFoundError:
+                pass  # already evicted by another process
+
+    def save(self):
+        """Persist the immutable-key ETag index so the next run skips their HEADs."""
+        with self._lock:
+            etags = dict(self._etags)
+        with open(self._index_path, "w") as f:
+            json.dump(etags, f)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = f"{100 * self.hits / total:.0f}%" if total else "n/a"
+        return (
+            f"S3 cache: {self.hits} hit(s), {self.misses} miss(es) ({rate} hit rate), "
+            f"{self.bytes_fetched / 1024**2:.1f} MiB fetched, {self.evictions} eviction(s)"
+        )
+
+
+class CachedS3FileSystem(AbstractFileSystem):
+    """Read-only fsspec filesystem for s3:// paths backed by an S3Cache.
+
+    Resolved local paths are pinned for the lifetime of the instance, so the
+    info/modified/open calls a reader makes per file cost one cache lookup and the
+    session sees one consistent version of every object.
+    """
+
+    protocol = ("s3", "s3a")
+    root_marker = ""
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self._resolved = {}
+
+    def _local(self, path):
+        bucket, key = self._split(path)
+        pinned = self._resolved.get((bucket, key))
+        if pinned is None or not os.path.exists(pinned):  # new, or evicted since
+            self._resolved[(bucket, key)] = self.cache.path(bucket, key)
+        return self._resolved[(bucket, key)]
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        for protocol in cls.protocol:
+            path = path.removeprefix(f"{protocol}://")
+        return path.rstrip("/")
+
+    def _split(self, path):
+        bucket, _, key = self._strip_protocol(path).partition("/")
+        return bucket, key
+
+    def ls(self, path, detail=True, **kwargs):
+        bucket, prefix = self._split(path)
+        prefix = f"{prefix}/" if prefix else ""
+        entries = []
+        paginator = self.cache.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+            for common in page.get("CommonPrefixes", []):
+                entries.append({"name": f"{bucket}/{common['Prefix'].rstrip('/')}",
+                                "size": 0, "type": "directory"})
+            for obj in page.get("Contents", []):
+                entries.append({"name": f"{bucket}/{obj['Key']}", "size": obj["Size"], "type": "file"})
+        return entries if detail else [e["name"] for e in entries]
+
+    def info(self, path, **kwargs):
+        bucket, key = self._split(path)
+        try:
+            return {"name": f"{bucket}/{key}", "size": os.path.getsize(self._local(path)), "type": "file"}
+        except Exception:
+            # Not an object: a "directory" if anything lives under it.
+            if self.ls(path, detail=False):
+                return {"name": f"{bucket}/{key}", "size": 0, "type": "directory"}
+            raise FileNotFoundError(path)
+
+    def modified(self, path):
+        return datetime.fromtimestamp(os.stat(self._local(path)).st_mtime)
+
+    def _open(self, path, mode="rb", **kwargs):
+        if "r" not in mode:
+            raise NotImplementedError("CachedS3FileSystem is read-only")
+        return LocalFileOpener(self._local(path), mode, fs=self)
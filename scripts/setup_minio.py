@@ -1,22 +1,18 @@
 """Create the lakehouse bucket in MinIO and verify connectivity."""
-import boto3
-from botocore.client import Config
+from lakehouse_config import BUCKET, s3_client
 
-s3 = boto3.client(
-    "s3",
-    endpoint_url="http://localhost:9000",
-    aws_access_key_id="minioadmin",
-    aws_secret_access_key="minioadmin",
-    config=Config(signature_version="s3v4"),
-    region_name="us-east-1",
-)
 
-bucket = "lakehouse"
-existing = [b["Name"] for b in s3.list_buckets().get("Buckets", [])]
-if bucket not in existing:
-    s3.create_bucket(Bucket=bucket)
-    print(f"Created bucket: {bucket}")
-else:
-    print(f"Bucket already exists: {bucket}")
+def main():
+    s3 = s3_client()
+    existing = [b["Name"] for b in s3.list_buckets().get("Buckets", [])]
+    if BUCKET not in existing:
+        s3.create_bucket(Bucket=BUCKET)
+        print(f"Created bucket: {BUCKET}")
+    else:
+        print(f"Bucket already exists: {BUCKET}")
 
-print("MinIO setup complete.")
+    print("MinIO setup complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,98 @@
 #!/usr/bin/env python3
 """
-Idempotent Superset setup: creates a Trino database connection, DDI datasets,
-charts, and a dashboard backed by the Iceberg lakehouse via Trino.
+Idempotent Superset setup: creates a Trino database connection, then provisions
+datasets, charts and dashboards backed by the Iceberg lakehouse via Trino.
+
+Dashboards and their datasets come from dbt exposures (models/exposures.yml) and
+charts from superset/charts.yml; superset_provision.py diffs them against
+Superset and applies only the changes, concurrently.
+
+Order charts are declared as specs (grain, dimensions, metrics) and routed to the
+coarsest pre-aggregated rollup (models/rollups/) that can answer them, falling
+back to marts.orders only when no rollup fits.
+
+After setup, the dashboard is warmed up: every chart is fetched concurrently
+through Superset's warm_up_cache endpoint so the first viewer hits warm Superset
+result and Trino metadata caches. Cold vs warm latency is reported per chart.
+Under `run_checks.sh --changed` only charts whose dataset was rebuilt are warmed
+(pipeline_selection.py); the rest still hold valid cached results.
 
 Safe to re-run: existing resources are detected and reused.
+
+Usage:
+    python scripts/setup_superset.py               # setup + warm-up
+    python scripts/setup_superset.py --dry-run     # print the provisioning plan only
+    python scripts/setup_superset.py --warm-up-only
 """
 
-import json
+import argparse
 import sys
+import time
 
-import requests
+from lakehouse_config import SUPERSET_URL
+from pipeline_selection import is_selected, selected_tables
+from superset_index import ResourceIndex
+from superset_provision import Provisioner, load_chart_specs, load_exposures, model_schemas, position_chart_ids
+from tracing import ThreadPoolExecutor, instrument_session, span
 
-SUPERSET_URL = "http://localhost:8088"
 TRINO_URI = "trino://trino_user@trino:8080/lakehouse/ddi"
 DB_NAME = "Trino Lakehouse"
 DASHBOARD_TITLE = "Rolling Sales Dashboard (Trino/Iceberg)"
+WARM_UP_WORKERS = 8
+PROVISION_WORKERS = 8
+
+PAYMENT_METHOD_METRICS = ["credit_card_amount", "coupon_amount", "bank_transfer_amount", "gift_card_amount"]
+
+# Rollup datasets, coarsest first. Each row is (period_start, status) pre-aggregated.
+ROLLUPS = [
+    {"schema": "rollups", "table": "orders_monthly", "grain": "month", "time_column": "period_start",
+     "dimensions": ["status"], "metrics": ["order_count", "amount"] + PAYMENT_METHOD_METRICS},
+    {"schema": "rollups", "table": "orders_weekly", "grain": "week", "time_column": "period_start",
+     "dimensions": ["status"], "metrics": ["order_count", "amount"] + PAYMENT_METHOD_METRICS},
+    {"schema": "rollups", "table": "orders_daily", "grain": "day", "time_column": "period_start",
+     "dimensions": ["status"], "metrics": ["order_count", "amount"] + PAYMENT_METHOD_METRICS},
+]
+
+# Row-level fallback when no rollup satisfies a chart.
+BASE_ORDERS = {"schema": "marts", "table": "orders", "grain": "day", "time_column": "order_date",
+               "dimensions": ["status", "customer_id"], "metrics": ["order_count", "amount"] + PAYMENT_METHOD_METRICS}
+
+# Grains a dataset of a given grain can be re-aggregated to (weeks do not nest in months).
+DERIVABLE_GRAINS = {
+    "day": {"day", "week", "month"},
+    "week": {"week"},
+    "month": {"month"},
+}
+TIME_GRAIN_SQLA = {"day": "P1D", "week": "P1W", "month": "P1M"}
+
+CHART_SPECS = load_chart_specs()
+
+ORDER_CHARTS = [{"name": c["name"], **c["route"]} for c in CHART_SPECS if "route" in c]
 
 
 class SupersetClient:
-    def __init__(self, username="admin", password="admin"):
+    def __init__(self, username="admin", password="admin", index_cache=None):
+        # Deferred so that importing this module (dashboard_queries, ORDER_CHARTS) stays cheap.
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         self.base = SUPERSET_URL
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), "superset")
+        # Pooled connections shared by the provisioning and warm-up thread pools.
+        # Idempotent methods are retried with backoff on 429/5xx; POSTs only on
+        # connection errors, so a create is never sent twice after it reached Superset.
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PROVISION_WORKERS * 2, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self._login(username, password)
+        self.index = ResourceIndex(self, cache_path=index_cache)
 
     def _login(self, username, password):
         resp = self.session.post(
@@ -47,17 +118,82 @@ class SupersetClient:
         return self.session.put(f"{self.base}{path}", **kwargs)
 
 
-def find_resource(client, list_path, name_field, name_value, page_size=100):
-    resp = client.get(f"{list_path}?q=(page_size:{page_size})")
-    resp.raise_for_status()
-    for item in resp.json().get("result", []):
-        if item.get(name_field) == name_value:
-            return item
-    return None
+def route_chart(spec):
+    """Return the coarsest rollup that can answer a chart spec, else BASE_ORDERS."""
+    for rollup in ROLLUPS:
+        if (
+            spec["grain"] in DERIVABLE_GRAINS[rollup["grain"]]
+            and set(spec["dimensions"]) <= set(rollup["dimensions"])
+            and set(spec["metrics"]) <= set(rollup["metrics"])
+        ):
+            return rollup
+    return BASE_ORDERS
+
+
+def metric_expression(target, metric):
+    # Rollups store order_count pre-aggregated; the base table has one row per order.
+    if metric == "order_count" and target is BASE_ORDERS:
+        return "COUNT(*)"
+    return f"SUM({metric})"
+
+
+def chart_sql(target, spec):
+    """SQL equivalent of what Superset issues for a chart spec against a dataset."""
+    period = f"date_trunc('{spec['grain']}', {target['time_column']})"
+    select = [f"{period} AS period_start"] + spec["dimensions"] + [
+        f"{metric_expression(target, m)} AS {m}" for m in spec["metrics"]
+    ]
+    group_by = ", ".join(str(i + 1) for i in range(1 + len(spec["dimensions"])))
+    return (
+        f"SELECT {', '.join(select)} "
+        f"FROM lakehouse.{target['schema']}.{target['table']} "
+        f"GROUP BY {group_by} ORDER BY 1"
+    )
+
+
+def dashboard_queries():
+    """(chart name, Trino SQL) for every chart in superset/charts.yml, as the chart issues it."""
+    schemas = model_schemas()
+    queries = []
+    for spec in CHART_SPECS:
+        if "route" in spec:
+            route = {"name": spec["name"], **spec["route"]}
+            queries.append((spec["name"], chart_sql(route_chart(route), route)))
+        else:
+            params = spec["params"]
+            queries.append((
+                spec["name"],
+                f"SELECT {', '.join(params['all_columns'])} "
+                f"FROM lakehouse.{schemas[spec['dataset']]}.{spec['dataset']} "
+                f"LIMIT {params.get('row_limit', 1000)}",
+            ))
+    return queries
+
+
+def chart_params(target, spec):
+    metrics = []
+    for m in spec["metrics"]:
+        expression = metric_expression(target, m)
+        if expression == "COUNT(*)":
+            metrics.append({"expressionType": "SQL", "sqlExpression": expression, "label": m})
+        else:
+            metrics.append({
+                "expressionType": "SIMPLE",
+                "column": {"column_name": m},
+                "aggregate": "SUM",
+                "label": m,
+            })
+    return {
+        "x_axis": target["time_column"],
+        "time_grain_sqla": TIME_GRAIN_SQLA[spec["grain"]],
+        "metrics": metrics,
+        "groupby": spec["dimensions"],
+        "row_limit": 10000,
+    }
 
 
 def ensure_database(client):
-    existing = find_resource(client, "/api/v1/database/", "database_name", DB_NAME)
+    existing = client.index.find("database", DB_NAME)
     if existing:
         print(f"  [skip] database '{DB_NAME}' already exists (id={existing['id']})")
         return existing["id"]
@@ -78,168 +214,137 @@ def ensure_database(client):
         print(f"  [error] creating database: {resp.text}")
         sys.exit(1)
     db_id = resp.json()["id"]
+    client.index.add("database", {"id": db_id, "database_name": DB_NAME})
     print(f"  [created] database '{DB_NAME}' (id={db_id})")
     return db_id
 
 
-def ensure_dataset(client, db_id, schema, table):
-    resp = client.get("/api/v1/dataset/?q=(page_size:100)")
-    resp.raise_for_status()
-    datasets = resp.json().get("result", [])
-
-    # Already pointing at the right database
-    for ds in datasets:
-        if ds["table_name"] == table and ds.get("schema") == schema and ds["database"]["id"] == db_id:
-            print(f"  [skip] dataset '{schema}.{table}' already exists (id={ds['id']})")
-            return ds["id"]
-
-    # Same table name exists but pointing at wrong database — migrate it
-    for ds in datasets:
-        if ds["table_name"] == table:
-            ds_id = ds["id"]
-            resp = client.put(
-                f"/api/v1/dataset/{ds_id}",
-                # catalog=null so Superset uses the default from the connection URI
-                json={"database_id": db_id, "catalog": None, "schema": schema, "table_name": table},
+def desired_state(chart_specs=None, exposures=None, schemas=None):
+    """Resolve exposures + chart spec into (datasets, charts, dashboards) for Provisioner."""
+    chart_specs = CHART_SPECS if chart_specs is None else chart_specs
+    exposures = load_exposures() if exposures is None else exposures
+    schemas = model_schemas() if schemas is None else schemas
+
+    datasets = []
+    for exposure in exposures.values():
+        for model in exposure["models"]:
+            if (schemas[model], model) not in datasets:
+                datasets.append((schemas[model], model))
+
+    charts = []
+    dashboards = {e["title"]: [] for e in exposures.values()}
+    for spec in chart_specs:
+        exposure = exposures[spec["exposure"]]
+        if "route" in spec:
+            route = {"name": spec["name"], **spec["route"]}
+            target = route_chart(route)
+            dataset = (target["schema"], target["table"])
+            viz_type, params = "echarts_timeseries_bar", chart_params(target, route)
+        else:
+            dataset = (schemas[spec["dataset"]], spec["dataset"])
+            viz_type, params = spec["viz_type"], spec["params"]
+        if dataset[1] not in exposure["models"]:
+            raise ValueError(
+                f"chart '{spec['name']}' reads {dataset[1]}, which exposure "
+                f"'{spec['exposure']}' does not depend on — add it to models/exposures.yml"
             )
-            if resp.status_code in (200, 201):
-                print(f"  [migrated] dataset '{table}' id={ds_id} → {schema} on db {db_id}")
-                return ds_id
-            print(f"  [error] migrating dataset {table}: {resp.text}")
-            return None
+        charts.append({"name": spec["name"], "dataset": dataset, "viz_type": viz_type, "params": params})
+        dashboards[exposure["title"]].append(spec["name"])
+    return datasets, charts, dashboards
 
-    resp = client.post(
-        "/api/v1/dataset/",
-        json={"database": db_id, "schema": schema, "table_name": table},
-    )
-    if resp.status_code != 201:
-        print(f"  [error] creating dataset {schema}.{table}: {resp.text}")
-        return None
-    ds_id = resp.json()["id"]
-    print(f"  [created] dataset '{schema}.{table}' (id={ds_id})")
-    return ds_id
-
-
-def ensure_chart(client, name, datasource_id, viz_type, params_dict):
-    existing = find_resource(client, "/api/v1/chart/", "slice_name", name)
-    if existing:
-        print(f"  [skip] chart '{name}' already exists (id={existing['id']})")
-        return existing["id"]
 
-    resp = client.post(
-        "/api/v1/chart/",
-        json={
-            "slice_name": name,
-            "datasource_id": datasource_id,
-            "datasource_type": "table",
-            "viz_type": viz_type,
-            "params": json.dumps(params_dict),
-        },
-    )
-    if resp.status_code != 201:
-        print(f"  [error] creating chart '{name}': {resp.text}")
+def warm_chart(client, dashboard_id, chart):
+    """Fetch a chart twice via warm_up_cache; return (cold_ms, warm_ms, error)."""
+    timings = []
+    for attempt in ("cold", "warm"):
+        start = time.perf_counter()
+        with span(f"warm up chart ({attempt})", chart=chart.get("slice_name", chart["id"])):
+            resp = client.put(
+                "/api/v1/chart/warm_up_cache",
+                json={"chart_id": chart["id"], "dashboard_id": dashboard_id},
+            )
+        timings.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            return timings[0], None, f"HTTP {resp.status_code}: {resp.text[:200]}"
+        errors = [r.get("viz_error") for r in resp.json().get("result", []) if r.get("viz_error")]
+        if errors:
+            return timings[0], None, errors[0]
+    return timings[0], timings[1], None
+
+
+def selected_chart_names(charts):
+    """Names of the charts whose dataset is selected, or None for a full run."""
+    if selected_tables() is None:
         return None
-    chart_id = resp.json()["id"]
-    print(f"  [created] chart '{name}' (id={chart_id})")
-    return chart_id
+    return {c["name"] for c in charts if is_selected(*c["dataset"])}
 
 
-def ensure_dashboard(client, title, chart_ids):
-    existing = find_resource(client, "/api/v1/dashboard/", "dashboard_title", title)
-    if existing:
-        print(f"  [skip] dashboard '{title}' already exists (id={existing['id']})")
-        return existing["id"]
-
-    # Build a simple grid layout for the charts
-    grid_children = []
-    col = 0
-    for i, cid in enumerate(chart_ids):
-        grid_children.append({
-            "id": f"CHART-{i}",
-            "type": "CHART",
-            "children": [],
-            "meta": {"chartId": cid, "width": 6, "height": 50, "sliceName": f"Chart {i}"},
-        })
-        col += 6
-
-    position = {
-        "DASHBOARD_VERSION_KEY": "v2",
-        "ROOT_ID": {"type": "ROOT", "id": "ROOT_ID", "children": ["GRID_ID"]},
-        "GRID_ID": {"type": "GRID", "id": "GRID_ID", "children": [f"ROW-0"], "parents": ["ROOT_ID"]},
-        "ROW-0": {
-            "type": "ROW",
-            "id": "ROW-0",
-            "children": [f"CHART-{i}" for i in range(len(chart_ids))],
-            "parents": ["ROOT_ID", "GRID_ID"],
-            "meta": {"background": "BACKGROUND_TRANSPARENT"},
-        },
-    }
-    for i, item in enumerate(grid_children):
-        item["parents"] = ["ROOT_ID", "GRID_ID", "ROW-0"]
-        position[f"CHART-{i}"] = item
+def warm_up_dashboard(client, title, max_workers=WARM_UP_WORKERS, only=None):
+    """Prime Superset's results cache for every chart on a dashboard (or those
+    named in only), concurrently."""
+    dashboard = client.index.find("dashboard", title)
+    if not dashboard:
+        print(f"  [skip] dashboard '{title}' not found")
+        return False
 
-    resp = client.post(
-        "/api/v1/dashboard/",
-        json={
-            "dashboard_title": title,
-            "position_json": json.dumps(position),
-        },
-    )
-    if resp.status_code != 201:
-        print(f"  [error] creating dashboard: {resp.text}")
-        return None
-    dash_id = resp.json()["id"]
-    print(f"  [created] dashboard '{title}' (id={dash_id})")
-    return dash_id
+    # Provisioning places charts in position_json only, without linking the slices
+    # to the dashboard, so /dashboard/{id}/charts can be empty: read the layout.
+    resp = client.get(f"/api/v1/dashboard/{dashboard['id']}")
+    resp.raise_for_status()
+    chart_ids = position_chart_ids(resp.json()["result"].get("position_json"))
+    if not chart_ids:
+        print(f"  [error] dashboard '{title}' has no charts in its layout")
+        return False
+    names = {c["id"]: name for name, items in client.index.load("chart").items() for c in items}
+    charts = [{"id": chart_id, "slice_name": names.get(chart_id, chart_id)} for chart_id in chart_ids]
+    if only is not None:
+        skipped = len(charts)
+        charts = [c for c in charts if c.get("slice_name") in only]
+        print(f"  {skipped - len(charts)} chart(s) read no rebuilt table; warming {len(charts)}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda c: warm_chart(client, dashboard["id"], c), charts))
+
+    ok = True
+    for chart, (cold_ms, warm_ms, error) in zip(charts, results):
+        name = chart.get("slice_name", chart["id"])
+        if error:
+            ok = False
+            print(f"  [error] '{name}': cold {cold_ms:.0f} ms — {error}")
+        else:
+            print(f"  [warmed] '{name}': cold {cold_ms:.0f} ms → warm {warm_ms:.0f} ms")
+    return ok
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Idempotent Superset setup for the Trino lakehouse.")
+    parser.add_argument("--warm-up-only", action="store_true",
+                        help="skip provisioning and only warm up the dashboard caches")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the datasets/charts/dashboards that would change, then exit")
+    parser.add_argument("--index-cache", metavar="PATH",
+                        help="persist the Superset name → id index here between runs")
+    args = parser.parse_args()
+
     print("==> Connecting to Superset...")
-    client = SupersetClient()
+    client = SupersetClient(index_cache=args.index_cache)
+
+    if args.warm_up_only:
+        print("==> Dashboard warm-up")
+        sys.exit(0 if warm_up_dashboard(client, DASHBOARD_TITLE, only=selected_chart_names(desired_state()[1])) else 1)
 
     print("==> Database connection")
     db_id = ensure_database(client)
 
-    print("==> Datasets")
-    ds_orders = ensure_dataset(client, db_id, "ddi", "rolling_30_day_orders")
-    ds_at_risk = ensure_dataset(client, db_id, "ddi", "at_risk_customers")
-
-    print("==> Charts")
-    chart_ids = []
-
-    cid = ensure_chart(
-        client,
-        "Rolling 30-Day Order Amounts (Trino/Iceberg)",
-        ds_orders,
-        "table",
-        {
-            "all_columns": ["order_date", "total_amount", "rolling_30_day_amount", "rolling_30_day_avg_daily"],
-            "order_by_cols": [],
-            "row_limit": 50,
-        },
-    )
-    if cid:
-        chart_ids.append(cid)
-
-    cid = ensure_chart(
-        client,
-        "At-Risk Customers (Trino/Iceberg)",
-        ds_at_risk,
-        "table",
-        {
-            "all_columns": ["customer_id", "first_name", "last_name", "days_since_last_order", "completed_orders"],
-            "order_by_cols": [],
-            "row_limit": 100,
-        },
-    )
-    if cid:
-        chart_ids.append(cid)
-
-    print("==> Dashboard")
-    if chart_ids:
-        ensure_dashboard(client, DASHBOARD_TITLE, chart_ids)
-    else:
-        print("  [skip] no charts created, skipping dashboard")
+    datasets, charts, dashboards = desired_state()
+    provisioner = Provisioner(client, db_id, max_workers=PROVISION_WORKERS, dry_run=args.dry_run)
+    provisioner.run(datasets, charts, dashboards)
+    if args.dry_run:
+        return
+
+    print("==> Dashboard warm-up")
+    with span("dashboard warm-up"):
+        warm_up_dashboard(client, DASHBOARD_TITLE, only=selected_chart_names(charts))
 
     print("\nSuperset setup complete.")
     print(f"  Dashboard: {SUPERSET_URL}/superset/dashboard/")
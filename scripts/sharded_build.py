@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Sharded dbt build: independent parts of the DAG run as parallel dbt processes,
+each on its own DuckDB database, all writing to the shared Iceberg lake.
+
+`dbt build` keeps the whole DAG in one process and one DuckDB file. External
+models only meet through S3 (downstream models read them back via
+iceberg_scan), so they can be built in separate processes:
+
+  1. base: seeds and every non-external model (staging views,
+     customer_order_state) are built and tested once in the main database (the
+     dev target's path). Tests that touch an external model are left for the
+     merge step.
+  2. shards: external models are grouped (--by component: connected components
+     of the external-model graph; --by folder: models/<folder>) and packed into
+     at most --workers shards per wave, balanced by the last run's model timings.
+     A group's wave comes after every group it reads from, and a wave starts
+     only when all shards of the previous wave are done. Each shard runs
+     `dbt run --target shard` on its own copy of the main database. The copy is
+     taken after earlier waves' models were added as iceberg_scan views, so
+     upstream models from other shards are read from the lake.
+  3. merge: the shards' models become iceberg_scan views in the main database,
+     their main.dbt_build_profile rows are copied over, and the external
+     models' tests run there. target/run_results.json is rewritten with every
+     phase's results under one invocation id, so profile_build.py reports the
+     sharded build.
+
+With LAKEHOUSE_CATALOG_COMMIT=true (set by run_checks.sh), each shard commits
+its own tables to the REST catalog (iceberg_catalog_plugin).
+Shards share nothing but S3 and the catalog. `--plan` prints each wave's dbt
+commands, which can also be run on separate hosts in wave order.
+
+Usage:
+    python scripts/sharded_build.py                  # 4 workers, shards by component
+    python scripts/sharded_build.py --workers 2 --by folder
+    python scripts/sharded_build.py --plan           # print the shards and exit
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+
+from lakehouse_duckdb import profile_output, profile_session
+from tracing import ThreadPoolExecutor, span
+
+MANIFEST = "target/manifest.json"
+RUN_RESULTS = "target/run_results.json"
+SHARD_ROOT = "target/shards"
+# Tests attached to an external model are dropped with it and run after the merge.
+BASE_SELECTION = ["--resource-type", "seed", "--resource-type", "model", "--resource-type", "test",
+                  "--exclude", "config.materialized:external"]
+TEST_SELECTION = ["--select", "config.materialized:external"]
+
+
+def dbt(args, target_path=None, env=None):
+    """Run a dbt command; returns (exit code, parsed run_results.json or None)."""
+    command = ["dbt", *args]
+    if target_path:
+        command += ["--target-path", target_path, "--log-path", os.path.join(target_path, "logs")]
+    returncode = subprocess.call(command, env=env)
+    results_path = os.path.join(target_path or "target", "run_results.json")
+    results = None
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            results = json.load(f)
+    return returncode, results
+
+
+def external_models(manifest):
+    """unique_id → node for every external model, with "upstream": the external
+    models it reads, directly or through non-external models."""
+    nodes = manifest["nodes"]
+    external = {
+        uid: node for uid, node in nodes.items()
+        if node["resource_type"] == "model" and node["config"].get("materialized") == "external"
+    }
+
+    def external_ancestors(uid, seen):
+        found = set()
+        for parent in nodes.get(uid, {}).get("depends_on", {}).get("nodes", []):
+            if parent in seen:
+                continue
+            seen.add(parent)
+            found |= {parent} if parent in external else external_ancestors(parent, seen)
+        return found
+
+    for uid, node in nodes.items():
+        if node["resource_type"] == "model" and uid not in external:
+            if external_ancestors(uid, set()):
+                sys.exit(f"{uid} is not external but reads an external model; "
+                         "the base phase builds it before any shard runs")
+    for uid, node in external.items():
+        if node["config"].get("format", "parquet") != "iceberg":
+            sys.exit(f"{uid}: only format: iceberg externals can be read across shards")
+        node["upstream"] = external_ancestors(uid, set())
+    return external
+
+
+def groups(models, by):
+    """[[unique_id]] that must be built together: connected components of the
+    external-model graph, or one group per models/<folder>."""
+    if by == "folder":
+        folders = {}
+        for uid, node in models.items():
+            folders.setdefault(node["fqn"][1], []).append(uid)
+        return list(folders.values())
+
+    component = {uid: uid for uid in models}
+
+    def find(uid):
+        while component[uid] != uid:
+            component[uid] = component[component[uid]]
+            uid = component[uid]
+        return uid
+
+    for uid, node in models.items():
+        for parent in node["upstream"]:
+            component[find(parent)] = find(uid)
+    members = {}
+    for uid in models:
+        members.setdefault(find(uid), []).append(uid)
+    return list(members.values())
+
+
+def last_timings(path=RUN_RESULTS):
+    """unique_id → execution seconds from the previous run, if there is one."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {r["unique_id"]: r["execution_time"] for r in json.load(f)["results"]}
+
+
+def plan_waves(models, model_groups, workers, timings):
+    """[[shard]] where a shard is a sorted list of unique_ids.
+
+    A group's wave is one more than the latest wave of any group it reads from,
+    so groups in the same wave never depend on each other and can be packed into
+    shards freely: largest first onto the least-loaded of at most `workers`
+    shards, weighted by last run's execution time (1s per model without one).
+    """
+    group_of = {uid: i for i, group in enumerate(model_groups) for uid in group}
+    level = {}
+
+    def wave_of(i):
+        if level.get(i) == "visiting":
+            sys.exit("shard groups read each other in a cycle; use --by component")
+        if i not in level:
+            level[i] = "visiting"
+            upstream = {group_of[p] for uid in model_groups[i] for p in models[uid]["upstream"]} - {i}
+            level[i] = 1 + max((wave_of(j) for j in upstream), default=-1)
+        return level[i]
+
+    waves = []
+    for i in sorted(range(len(model_groups)), key=wave_of):
+        while len(waves) <= wave_of(i):
+            waves.append([])
+        waves[wave_of(i)].append(model_groups[i])
+
+    def weight(group):
+        return sum(timings.get(uid, 1.0) for uid in group)
+
+    planned = []
+    for wave in waves:
+        shards = [[] for _ in range(min(workers, len(wave)))]
+        for group in sorted(wave, key=weight, reverse=True):
+            min(shards, key=weight).extend(group)
+        planned.append([sorted(shard) for shard in shards])
+    return planned
+
+
+def selection(shard, models):
+    return [models[uid]["name"] for uid in shard]
+
+
+def add_views(database, output, models, uids):
+    """Create the external materialization's iceberg_scan view for each model in database."""
+    root = output["external_root"].rstrip("/")
+    con = profile_session(output, database)
+    try:
+        for uid in uids:
+            node = models[uid]
+            relation = node.get("alias") or node["name"]
+            location = node["config"].get("location") or f"{root}/{relation}.iceberg"
+            con.execute(f'CREATE SCHEMA IF NOT EXISTS "{node["schema"]}"')
+            con.execute(
+                f'CREATE OR REPLACE VIEW "{node["schema"]}"."{relation}" AS '
+                f"SELECT * FROM iceberg_scan('{location}')"
+            )
+    finally:
+        con.close()
+
+
+def merge_build_profile(database, output, shard_database, shard_invocation_id, invocation_id):
+    """Copy one shard run's main.dbt_build_profile rows, re-keyed to invocation_id."""
+    con = profile_session(output, database)
+    try:
+        con.execute(f"ATTACH '{shard_database}' AS shard (READ_ONLY)")
+        con.execute(
+            "INSERT INTO main.dbt_build_profile "
+            "SELECT ?, unique_id, phase, seconds, recorded_at FROM shard.main.dbt_build_profile "
+            "WHERE invocation_id = ?",
+            [invocation_id, shard_invocation_id],
+        )
+    finally:
+        con.close()
+
+
+def run_shard(name, shard, models, main_database):
+    """Build one shard with `dbt run --target shard` on a copy of the main database."""
+    shard_dir = os.path.join(SHARD_ROOT, name)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.makedirs(shard_dir)
+    database = os.path.join(shard_dir, os.path.basename(main_database))
+    shutil.copy2(main_database, database)
+
+    env = dict(os.environ, JAFFLE_SHARD_DATABASE=os.path.abspath(database))
+    with span("shard", shard=name, models=len(shard)) as s:
+        start = time.perf_counter()
+        returncode, results = dbt(
+            ["run", "--target", "shard", "--select", *selection(shard, models)],
+            target_path=os.path.join(shard_dir, "target"), env=env,
+        )
+        s.set("exit_code", returncode)
+        if returncode:
+            s.error = f"exit code {returncode}"
+    return name, database, returncode, results, time.perf_counter() - start
+
+
+def write_run_results(phase_results, invocation_id, elapsed, path=RUN_RESULTS):
+    """One run_results.json with every phase's node results under invocation_id."""
+    phase_results = [r for r in phase_results if r]
+    if not phase_results:
+        return
+    merged = dict(phase_results[-1])
+    merged["metadata"] = dict(merged["metadata"], invocation_id=invocation_id)
+    merged["results"] = [result for run in phase_results for result in run["results"]]
+    merged["elapsed_time"] = elapsed
+    merged["args"] = dict(merged.get("args", {}), which="sharded_build")
+    with open(path, "w") as f:
+        json.dump(merged, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--workers", type=int, default=4, help="maximum concurrent shards per wave")
+    parser.add_argument("--by", choices=["component", "folder"], default="component",
+                        help="how external models are grouped into shards")
+    parser.add_argument("--plan", action="store_true", help="print the shard plan and exit")
+    parser.add_argument("--skip-tests", action="store_true", help="skip the external models' tests")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output = profile_output()
+    main_database = output["path"]
+    invocation_id = str(uuid.uuid4())
+    timings = last_timings()
+
+    with span("dbt parse"):
+        returncode, _ = dbt(["parse"])
+    if returncode:
+        sys.exit(returncode)
+    with open(MANIFEST) as f:
+        models = external_models(json.load(f))
+    waves = plan_waves(models, groups(models, args.by), args.workers, timings)
+
+    print(f"-- {len(models)} external model(s) in {sum(map(len, waves))} shard(s), {len(waves)} wave(s)")
+    print(f"  base: dbt build {' '.join(BASE_SELECTION)}")
+    for w, wave in enumerate(waves):
+        for i, shard in enumerate(wave):
+            print(f"  wave {w} shard {i}: dbt run --target shard --select {' '.join(selection(shard, models))}")
+    print(f"  test: dbt test {' '.join(TEST_SELECTION)}")
+    if args.plan:
+        return
+
+    print("\n==> base: seeds and non-external models")
+    with span("base"):
+        returncode, base_results = dbt(["build", *BASE_SELECTION])
+    phase_results = [base_results]
+    failed = returncode != 0
+
+    for w, wave in enumerate(waves):
+        if failed:
+            break
+        print(f"\n==> wave {w}: {len(wave)} shard(s)")
+        with span("wave", wave=w, shards=len(wave)), ThreadPoolExecutor(max_workers=len(wave)) as pool:
+            runs = list(pool.map(
+                lambda item: run_shard(f"wave{w}-shard{item[0]}", item[1], models, main_database),
+                enumerate(wave),
+            ))
+        built = []
+        for (name, database, returncode, results, seconds), shard in zip(runs, wave):
+            print(f"  {name}: {'ok' if returncode == 0 else f'exit code {returncode}'} in {seconds:.1f}s "
+                  f"({', '.join(selection(shard, models))})")
+            phase_results.append(results)
+            if results:
+                merge_build_profile(main_database, output, database,
+                                    results["metadata"]["invocation_id"], invocation_id)
+            if returncode:
+                failed = True
+            else:
+                built.extend(shard)
+        # Later waves copy the main database, so these are how they read this wave's models.
+        if built:
+            add_views(main_database, output, models, built)
+
+    if not failed and not args.skip_tests:
+        print("\n==> dbt test: external models")
+        with span("dbt test"):
+            returncode, test_results = dbt(["test", *TEST_SELECTION])
+        phase_results.append(test_results)
+        failed = returncode != 0
+
+    elapsed = time.perf_counter() - start
+    write_run_results(phase_results, invocation_id, elapsed)
+    print(f"\nSharded build {'FAILED' if failed else 'finished'} in {elapsed:.1f}s "
+          f"(invocation {invocation_id}; results in {RUN_RESULTS})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Name → resource index for the Superset REST API.
+
+Superset list endpoints are paginated (at most 100 items per page), so scanning a
+single page silently misses resources on larger instances. ResourceIndex:
+
+  - looks up single names with a server-side rison filter (`opr:eq`), one request;
+  - loads a whole resource type at most once per run, paginating until `count`
+    items have been read, into an in-memory name → [items] map;
+  - optionally persists loaded maps to a JSON file between runs. A persisted map is
+    reused only if the newest `changed_on` and the total `count` reported by the
+    server still match, which costs one single-item request.
+
+Used by setup_superset.py and test_superset.py with their SupersetClient (anything
+with a `get(path)` method returning a requests.Response).
+"""
+
+import json
+import os
+
+PAGE_SIZE = 100
+
+# resource → field holding its display name
+NAME_FIELDS = {
+    "database": "database_name",
+    "dataset": "table_name",
+    "chart": "slice_name",
+    "dashboard": "dashboard_title",
+}
+
+
+def rison_string(value):
+    """Encode a Python string as a rison string literal."""
+    escaped = value.replace("!", "!!").replace("'", "!'")
+    return f"'{escaped}'"
+
+
+def changed_on(item):
+    # Charts, datasets and dashboards list `changed_on_utc`; databases list `changed_on`.
+    return item.get("changed_on_utc") or item.get("changed_on") or ""
+
+
+class ResourceIndex:
+    def __init__(self, client, cache_path=None):
+        self.client = client
+        self.cache_path = cache_path
+        self._loaded = {}    # resource → {name: [items]}
+        self._lookups = {}   # (resource, name) → [items] from filtered queries
+        self._persisted = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as f:
+                self._persisted = json.load(f)
+
+    def _list(self, resource, query):
+        resp = self.client.get(f"/api/v1/{resource}/?q={query}")
+        resp.raise_for_status()
+        return resp.json()
+
+    def _newest(self, resource):
+        body = self._list(
+            resource,
+            "(order_column:changed_on_delta_humanized,order_direction:desc,page:0,page_size:1)",
+        )
+        result = body.get("result", [])
+        return body.get("count", 0), changed_on(result[0]) if result else ""
+
+    def _fetch_all(self, resource):
+        items, page = [], 0
+        while True:
+            body = self._list(resource, f"(page:{page},page_size:{PAGE_SIZE})")
+            batch = body.get("result", [])
+            items.extend(batch)
+            if not batch or len(items) >= body.get("count", 0):
+                return items
+            page += 1
+
+    def load(self, resource):
+        """Return the name → [items] map for a resource type, loading it at most once."""
+        if resource in self._loaded:
+            return self._loaded[resource]
+
+        items = None
+        cached = self._persisted.get(resource)
+        if cached:
+            count, newest = self._newest(resource)
+            if count == cached["count"] and newest == cached["newest"]:
+                items = cached["items"]
+        if items is None:
+            items = self._fetch_all(resource)
+            self._persist(resource, items)
+
+        by_name = {}
+        for item in items:
+            by_name.setdefault(item.get(NAME_FIELDS[resource]), []).append(item)
+        self._loaded[resource] = by_name
+        return by_name
+
+    def find_all(self, resource, name):
+        """All resources of a type with the given name (datasets may repeat across schemas)."""
+        if resource in self._loaded or resource in self._persisted:
+            return self.load(resource).get(name, [])
+
+        key = (resource, name)
+        if key not in self._lookups:
+            field = NAME_FIELDS[resource]
+            body = self._list(
+                resource,
+                f"(filters:!((col:{field},opr:eq,value:{rison_string(name)})),page_size:{PAGE_SIZE})",
+            )
+            self._lookups[key] = body.get("result", [])
+        return self._lookups[key]
+
+    def find(self, resource, name):
+        matches = self.find_all(resource, name)
+        return matches[0] if matches else None
+
+    def add(self, resource, item):
+        """Record a resource created during this run so later lookups see it."""
+        name = item.get(NAME_FIELDS[resource])
+        if resource in self._loaded:
+            self._loaded[resource].setdefault(name, []).append(item)
+        self._lookups.setdefault((resource, name), []).append(item)
+        # A persisted snapshot is refreshed next run: the server count no longer matches.
+
+    def _persist(self, resource, items):
+        if not self.cache_path:
+            return
+        self._persisted[resource] = {
+            "count": len(items),
+            "newest": max((changed_on(i) for i in items), default=""),
+            "items": items,
+        }
+        with open(self.cache_path, "w") as f:
+            json.dump(self._persisted, f)
@@ -0,0 +1,247 @@
+"""
+Declarative Superset provisioning: diff desired datasets, charts and dashboards
+against Superset's current state and apply only the differences.
+
+Desired state is read from dbt exposures (models/exposures.yml: one dashboard per
+exposure, its depends_on models as datasets) plus a chart spec (superset/charts.yml).
+Current state comes from one paginated bulk read per resource type through
+ResourceIndex. Changes are applied in dependency order (datasets → charts →
+dashboards); within each phase, requests run concurrently over the client's pooled
+session. When nothing changed, a run is the bulk reads only.
+"""
+
+import glob
+import json
+import os
+import re
+import yaml
+
+from tracing import ThreadPoolExecutor, span
+
+REF_PATTERN = re.compile(r"""ref\(\s*['"](\w+)['"]\s*\)""")
+
+
+def model_schemas(models_dir="models"):
+    """model name → schema; models/<layer>/ maps to the <layer> schema (dbt_project.yml)."""
+    schemas = {}
+    for path in glob.glob(os.path.join(models_dir, "*", "*.sql")):
+        layer = os.path.basename(os.path.dirname(path))
+        schemas[os.path.splitext(os.path.basename(path))[0]] = layer
+    return schemas
+
+
+def load_exposures(path="models/exposures.yml"):
+    with open(path) as f:
+        exposures = yaml.safe_load(f)["exposures"]
+    return {
+        e["name"]: {
+            "title": e.get("label", e["name"]),
+            "models": [m for dep in e.get("depends_on", []) for m in REF_PATTERN.findall(dep)],
+        }
+        for e in exposures
+        if e.get("type") == "dashboard"
+    }
+
+
+def load_chart_specs(path="superset/charts.yml"):
+    with open(path) as f:
+        return yaml.safe_load(f)["charts"]
+
+
+def dashboard_position(chart_ids):
+    """Single-row grid layout with one CHART node per chart id."""
+    position = {
+        "DASHBOARD_VERSION_KEY": "v2",
+        "ROOT_ID": {"type": "ROOT", "id": "ROOT_ID", "children": ["GRID_ID"]},
+        "GRID_ID": {"type": "GRID", "id": "GRID_ID", "children": ["ROW-0"], "parents": ["ROOT_ID"]},
+        "ROW-0": {
+            "type": "ROW",
+            "id": "ROW-0",
+            "children": [f"CHART-{i}" for i in range(len(chart_ids))],
+            "parents": ["ROOT_ID", "GRID_ID"],
+            "meta": {"background": "BACKGROUND_TRANSPARENT"},
+        },
+    }
+    for i, cid in enumerate(chart_ids):
+        position[f"CHART-{i}"] = {
+            "id": f"CHART-{i}",
+            "type": "CHART",
+            "children": [],
+            "parents": ["ROOT_ID", "GRID_ID", "ROW-0"],
+            "meta": {"chartId": cid, "width": 6, "height": 50, "sliceName": f"Chart {i}"},
+        }
+    return position
+
+
+def position_chart_ids(position_json):
+    """Chart ids on a dashboard, in layout order."""
+    if not position_json:
+        return []
+    position = json.loads(position_json)
+    chart_ids = []
+
+    def walk(node_id):
+        node = position.get(node_id) or {}
+        if node.get("type") == "CHART":
+            chart_ids.append(node["meta"]["chartId"])
+        for child in node.get("children", []):
+            walk(child)
+
+    walk("ROOT_ID")
+    return chart_ids
+
+
+class Provisioner:
+    def __init__(self, client, db_id, max_workers=8, dry_run=False):
+        self.client = client
+        self.db_id = db_id
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+        self.dataset_ids = {}  # (schema, table) → id
+        self.chart_ids = {}    # name → id
+        self.changes = 0
+
+    def _apply(self, actions):
+        """Run (label, fn) actions concurrently; fn returns (key, id) or raises."""
+        self.changes += len(actions)
+        if self.dry_run:
+            for label, _ in actions:
+                print(f"  [plan] {label}")
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda action: action[1](), actions))
+
+    def _check(self, resp, expected, what):
+        if resp.status_code not in expected:
+            raise RuntimeError(f"{what}: HTTP {resp.status_code} {resp.text[:300]}")
+        return resp
+
+    # ── datasets ─────────────────────────────────────────────────────────────
+    def datasets(self, wanted):
+        current = self.client.index.load("dataset")
+        actions = []
+        for schema, table in wanted:
+            existing = current.get(table, [])
+            match = next(
+                (ds for ds in existing if ds.get("schema") == schema and ds["database"]["id"] == self.db_id),
+                None,
+            )
+            if match:
+                self.dataset_ids[(schema, table)] = match["id"]
+            elif existing:
+                actions.append((f"migrate dataset {schema}.{table}", self._migrate_dataset(existing[0]["id"], schema, table)))
+            else:
+                actions.append((f"create dataset {schema}.{table}", self._create_dataset(schema, table)))
+        for key, ds_id in self._apply(actions):
+            self.dataset_ids[key] = ds_id
+
+    def _migrate_dataset(self, ds_id, schema, table):
+        def run():
+            self._check(self.client.put(
+                f"/api/v1/dataset/{ds_id}",
+                # catalog=null so Superset uses the default from the connection URI
+                json={"database_id": self.db_id, "catalog": None, "schema": schema, "table_name": table},
+            ), (200, 201), f"migrating dataset {table}")
+            print(f"  [migrated] dataset '{table}' id={ds_id} → {schema} on db {self.db_id}")
+            return (schema, table), ds_id
+        return run
+
+    def _create_dataset(self, schema, table):
+        def run():
+            resp = self._check(self.client.post(
+                "/api/v1/dataset/",
+                json={"database": self.db_id, "schema": schema, "table_name": table},
+            ), (201,), f"creating dataset {schema}.{table}")
+            ds_id = resp.json()["id"]
+            print(f"  [created] dataset '{schema}.{table}' (id={ds_id})")
+            return (schema, table), ds_id
+        return run
+
+    # ── charts ───────────────────────────────────────────────────────────────
+    def charts(self, wanted):
+        current = self.client.index.load("chart")
+        actions = []
+        for chart in wanted:
+            ds_id = self.dataset_ids.get(chart["dataset"])
+            if ds_id is None and not self.dry_run:
+                raise RuntimeError(f"chart '{chart['name']}': dataset {chart['dataset']} was not provisioned")
+            body = {
+                "slice_name": chart["name"],
+                "datasource_id": ds_id,
+                "datasource_type": "table",
+                "viz_type": chart["viz_type"],
+                "params": json.dumps(chart["params"], sort_keys=True),
+            }
+            existing = (current.get(chart["name"]) or [None])[0]
+            if existing is None:
+                actions.append((f"create chart '{chart['name']}'", self._write_chart(None, body)))
+                continue
+            self.chart_ids[chart["name"]] = existing["id"]
+            unchanged = (
+                existing.get("viz_type") == chart["viz_type"]
+                and existing.get("datasource_id") == ds_id
+                and json.loads(existing.get("params") or "{}") == chart["params"]
+            )
+            if not unchanged:
+                actions.append((f"update chart '{chart['name']}'", self._write_chart(existing["id"], body)))
+        for name, chart_id in self._apply(actions):
+            self.chart_ids[name] = chart_id
+
+    def _write_chart(self, chart_id, body):
+        def run():
+            if chart_id is None:
+                resp = self._check(self.client.post("/api/v1/chart/", json=body), (201,),
+                                   f"creating chart '{body['slice_name']}'")
+                new_id = resp.json()["id"]
+                print(f"  [created] chart '{body['slice_name']}' (id={new_id})")
+                return body["slice_name"], new_id
+            self._check(self.client.put(f"/api/v1/chart/{chart_id}", json=body), (200, 201),
+                        f"updating chart '{body['slice_name']}'")
+            print(f"  [updated] chart '{body['slice_name']}' (id={chart_id})")
+            return body["slice_name"], chart_id
+        return run
+
+    # ── dashboards ───────────────────────────────────────────────────────────
+    def dashboards(self, wanted):
+        current = self.client.index.load("dashboard")
+        actions = []
+        for title, chart_names in wanted.items():
+            chart_ids = [self.chart_ids[n] for n in chart_names if n in self.chart_ids]
+            existing = (current.get(title) or [None])[0]
+            if existing and position_chart_ids(existing.get("position_json")) == chart_ids:
+                continue
+            body = {"dashboard_title": title, "position_json": json.dumps(dashboard_position(chart_ids))}
+            dash_id = existing["id"] if existing else None
+            verb = "update" if existing else "create"
+            actions.append((f"{verb} dashboard '{title}'", self._write_dashboard(dash_id, body)))
+        self._apply(actions)
+
+    def _write_dashboard(self, dash_id, body):
+        def run():
+            title = body["dashboard_title"]
+            if dash_id is None:
+                resp = self._check(self.client.post("/api/v1/dashboard/", json=body), (201,),
+                                   f"creating dashboard '{title}'")
+                print(f"  [created] dashboard '{title}' (id={resp.json()['id']})")
+                return title, resp.json()["id"]
+            self._check(self.client.put(f"/api/v1/dashboard/{dash_id}", json=body), (200, 201),
+                        f"updating dashboard '{title}'")
+            print(f"  [updated] dashboard '{title}' (id={dash_id})")
+            return title, dash_id
+        return run
+
+    def run(self, datasets, charts, dashboards):
+        """datasets: [(schema, table)]; charts: [{name, dataset, viz_type, params}];
+        dashboards: {title: [chart names]}."""
+        print("==> Datasets")
+        with span("provision datasets"):
+            self.datasets(datasets)
+        print("==> Charts")
+        with span("provision charts"):
+            self.charts(charts)
+        print("==> Dashboards")
+        with span("provision dashboards"):
+            self.dashboards(dashboards)
+        if self.changes == 0:
+            print("  [skip] Superset already matches exposures and chart spec")
+        return self.changes
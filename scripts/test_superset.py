@@ -9,25 +9,44 @@ Checks:
   4. Trino Lakehouse database connection is registered
   5. DDI datasets exist (rolling_30_day_orders, at_risk_customers)
   6. Dashboard exists
-  7. SQL query via Superset SQL Lab reaches Trino and returns rows
+  7. SQL query via Superset SQL Lab reaches Trino and returns rows for every
+     dataset registered on the Trino database
      (verifies the full Superset → Trino → Iceberg path)
 
+Independent checks run concurrently in a thread pool, so total time tracks the
+slowest check rather than the sum of all of them. SQL Lab queries run
+asynchronously (submit, then poll for results) when the database has
+allow_run_async enabled, and synchronously otherwise. Each SQL probe runs
+--repeat times; per-check p50/p95 latency is printed and, with --history, appended
+as one JSON line per run to track Superset → Trino → Iceberg latency over time.
+
 Exit 0 on success, exit 1 on any failure.
 """
 
+import argparse
+import json
+import statistics
 import sys
 import time
+from collections import defaultdict
 
 import requests
 
-SUPERSET_URL = "http://localhost:8088"
+from lakehouse_config import SUPERSET_URL
+from superset_index import ResourceIndex
+from tracing import ThreadPoolExecutor, instrument_session, span
+
 DB_NAME = "Trino Lakehouse"
 DASHBOARD_TITLE = "Rolling Sales Dashboard (Trino/Iceberg)"
-PROBE_SQL = "SELECT order_date, rolling_30_day_amount FROM ddi.rolling_30_day_orders LIMIT 5"
+EXPECTED_DATASETS = ("rolling_30_day_orders", "at_risk_customers")
+MAX_WORKERS = 8
+POLL_INTERVAL = 0.5
+POLL_TIMEOUT = 120
 
 PASS = "PASS"
 FAIL = "FAIL"
 failures = []
+latencies = defaultdict(list)  # check label → [ms]
 
 
 def check(label, condition, detail=""):
@@ -41,7 +60,7 @@ def check(label, condition, detail=""):
 class SupersetClient:
     def __init__(self, username, password):
         self.base = SUPERSET_URL
-        self.session = requests.Session()
+        self.session = instrument_session(requests.Session(), "superset")
         self.token = None
         resp = self.session.post(
             f"{self.base}/api/v1/security/login",
@@ -67,6 +86,56 @@ class SupersetClient:
         return self.session.post(f"{self.base}{path}", timeout=30, **kw)
 
 
+def timed(label, fn, *args):
+    """Call fn(*args) in a trace span, recording its wall time under label."""
+    start = time.perf_counter()
+    try:
+        with span(label):
+            return fn(*args)
+    finally:
+        latencies[label].append((time.perf_counter() - start) * 1000)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def run_sql(client, db, sql):
+    """Run SQL through SQL Lab and return the result rows.
+
+    Uses async execution (submit, poll /query/updated_since, fetch results by key)
+    when the database allows it; otherwise the synchronous endpoint.
+    """
+    run_async = bool(db.get("allow_run_async"))
+    submitted_ms = int(time.time() * 1000) - 1000
+    resp = client.post(
+        "/api/v1/sqllab/execute/",
+        json={"database_id": db["id"], "sql": sql, "runAsync": run_async, "select_as_cta": False},
+    )
+    if resp.status_code not in (200, 202):
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:300]}")
+    body = resp.json()
+    if not run_async:
+        return body.get("data", [])
+
+    client_id = body["query"]["id"]
+    deadline = time.time() + POLL_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        poll = client.get(f"/api/v1/query/updated_since?q=(last_updated_ms:{submitted_ms})")
+        poll.raise_for_status()
+        query = next((q for q in poll.json().get("result", []) if q.get("id") == client_id), None)
+        if query is None or query.get("state") in ("pending", "running", "scheduled"):
+            continue
+        if query.get("state") != "success":
+            raise RuntimeError(f"query {query.get('state')}: {query.get('errorMessage')}")
+        results = client.get(f"/api/v1/sqllab/results/?q=(key:'{query['resultsKey']}')")
+        results.raise_for_status()
+        return results.json().get("data", [])
+    raise TimeoutError(f"query did not finish within {POLL_TIMEOUT}s")
+
+
 def wait_for_superset(timeout=30):
     deadline = time.time() + timeout
     while time.time() < deadline:
@@ -80,98 +149,125 @@ def wait_for_superset(timeout=30):
     return False
 
 
-def find_by_name(client, list_path, name_field, name_value):
-    resp = client.get(f"{list_path}?q=(page_size:200)")
-    if resp.status_code != 200:
-        return None
-    for item in resp.json().get("result", []):
-        if item.get(name_field) == name_value:
-            return item
-    return None
+def login(username, password):
+    return timed(f"{username} login", SupersetClient, username, password)
+
+
+def probe(client, db, label, sql, repeat):
+    rows = []
+    for _ in range(repeat):
+        rows = timed(label, run_sql, client, db, sql)
+    return rows
+
+
+def print_latency_summary():
+    print(f"  {'check':<52} {'n':>3} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for label, samples in latencies.items():
+        print(
+            f"  {label:<52} {len(samples):>3} {statistics.median(samples):>8.1f} "
+            f"{percentile(samples, 95):>8.1f} {max(samples):>8.1f}"
+        )
+
+
+def append_history(path):
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "failures": len(failures),
+        "checks": {
+            label: {"n": len(samples), "p50_ms": statistics.median(samples), "p95_ms": percentile(samples, 95)}
+            for label, samples in latencies.items()
+        },
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Superset → Trino → Iceberg smoke tests.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per SQL probe (for percentiles)")
+    parser.add_argument("--history", metavar="PATH", help="append per-check latency as JSON lines")
+    args = parser.parse_args()
+
     print("==> Superset integration tests")
     print()
 
     # 1. Health
     print("-- Health")
-    alive = wait_for_superset()
+    alive = timed("health", wait_for_superset)
     check("Superset /health responds 200", alive)
     if not alive:
         print("\nSuperset is unreachable. Aborting.")
         sys.exit(1)
 
-    # 2. Admin login
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+    # 2–3. Logins, concurrently
     print("\n-- Authentication")
+    admin_future = pool.submit(login, "admin", "admin")
+    analyst_future = pool.submit(login, "data_analyst", "analyst")
     try:
-        admin = SupersetClient("admin", "admin")
+        admin = admin_future.result()
         check("Admin login (JWT)", True)
     except Exception as e:
         check("Admin login (JWT)", False, str(e))
         print("\nCannot authenticate. Aborting.")
         sys.exit(1)
-
-    # 3. data_analyst login
     try:
-        SupersetClient("data_analyst", "analyst")
+        analyst_future.result()
         check("data_analyst login (JWT)", True)
     except Exception as e:
         check("data_analyst login (JWT)", False, str(e))
 
-    # 4. Trino database connection
+    # 4–6. Catalog lookups, concurrently
+    index = ResourceIndex(admin)
+    db_future = pool.submit(timed, "database lookup", index.find, "database", DB_NAME)
+    datasets_future = pool.submit(timed, "dataset list", index.load, "dataset")
+    dash_future = pool.submit(timed, "dashboard lookup", index.find, "dashboard", DASHBOARD_TITLE)
+
     print("\n-- Database connection")
-    db = find_by_name(admin, "/api/v1/database/", "database_name", DB_NAME)
+    db = db_future.result()
     check(f"Database '{DB_NAME}' registered", db is not None)
-    if db:
-        # Ping Trino by running SELECT 1 via SQL Lab
-        resp = admin.post(
-            "/api/v1/sqllab/execute/",
-            json={"database_id": db["id"], "sql": "SELECT 1 AS ping", "runAsync": False},
-        )
-        ok = resp.status_code == 200 and resp.json().get("data")
-        check(
-            "Trino connection is reachable from Superset (SELECT 1)",
-            ok,
-            resp.text[:200] if not ok else "",
-        )
 
-    # 5. Datasets
     print("\n-- Datasets")
-    for table in ("rolling_30_day_orders", "at_risk_customers"):
-        resp = admin.get("/api/v1/dataset/?q=(page_size:200)")
-        found = any(
-            ds["table_name"] == table and ds["database"]["id"] == (db["id"] if db else -1)
-            for ds in resp.json().get("result", [])
-        )
+    datasets = datasets_future.result()
+    db_datasets = [
+        ds for items in datasets.values() for ds in items
+        if ds["database"]["id"] == (db["id"] if db else -1)
+    ]
+    for table in EXPECTED_DATASETS:
+        found = any(ds["table_name"] == table for ds in db_datasets)
         check(f"Dataset '{table}' exists (Trino/Iceberg)", found)
 
-    # 6. Dashboard
     print("\n-- Dashboard")
-    dash = find_by_name(admin, "/api/v1/dashboard/", "dashboard_title", DASHBOARD_TITLE)
+    dash = dash_future.result()
     check(f"Dashboard '{DASHBOARD_TITLE}' exists", dash is not None)
 
-    # 7. End-to-end SQL via Superset SQL Lab → Trino → Iceberg
-    print("\n-- End-to-end query (Superset → Trino → Iceberg)")
+    # 7. SQL Lab → Trino → Iceberg, one probe per dataset, concurrently
+    print("\n-- End-to-end queries (Superset → Trino → Iceberg)")
     if db:
-        resp = admin.post(
-            "/api/v1/sqllab/execute/",
-            json={
-                "database_id": db["id"],
-                "sql": PROBE_SQL,
-                "runAsync": False,
-                "select_as_cta": False,
-            },
-        )
-        ok = resp.status_code == 200 and "data" in resp.json()
-        rows = len(resp.json().get("data", [])) if ok else 0
-        check(
-            f"SQL Lab query returns rows from Trino (got {rows})",
-            ok and rows > 0,
-            resp.text[:300] if not ok else "",
-        )
+        probes = {"SELECT 1": "SELECT 1 AS ping"}
+        for ds in db_datasets:
+            probes[f"{ds['schema']}.{ds['table_name']}"] = (
+                f"SELECT * FROM {ds['schema']}.{ds['table_name']} LIMIT 5"
+            )
+        futures = {
+            label: pool.submit(probe, admin, db, label, sql, args.repeat)
+            for label, sql in probes.items()
+        }
+        for label, future in futures.items():
+            try:
+                rows = future.result()
+                check(f"SQL Lab {label} returns rows from Trino (got {len(rows)})", len(rows) > 0)
+            except Exception as e:
+                check(f"SQL Lab {label}", False, str(e)[:300])
     else:
         check("SQL Lab query (skipped, no DB connection)", False, "no Trino database registered")
+    pool.shutdown()
+
+    print("\n-- Latency")
+    print_latency_summary()
+    if args.history:
+        append_history(args.history)
 
     # Summary
     print()
@@ -3,31 +3,31 @@
 Trino + Iceberg integration tests.
 
 Checks:
-  1. Iceberg REST catalog — all 4 tables are registered
+  1. Iceberg REST catalog — all serving tables are registered
   2. MinIO — Parquet data files exist for each table
   3. Trino row counts match the seed data (catches stale/wrong snapshot)
   4. Business invariants via Trino:
-       - at_risk_customers: every row has days_since_last_order >= 60
+       - at_risk_customers: every row has days_since_last_order >= churn_threshold_days
+         and matches customer_recency_cohorts filtered at the same threshold
        - rolling_30_day_orders: rolling_30_day_amount >= total_amount on every row
+       - rolling_order_metrics: 7d <= 30d <= 90d rolling amounts on every row
        - marts.customers: customer_lifetime_value >= 0
        - marts.orders: amount == sum of payment-method columns on every row
+       - rollups.orders_*: order_count and amount totals match marts.orders
+
+Under `run_checks.sh --changed` each check runs only if it reads a table
+selected by state:modified+ (pipeline_selection.py).
 
 Exit 0 on success, exit 1 on any failure.
 """
 
 import sys
 
-import boto3
-import trino
-from pyiceberg.catalog.rest import RestCatalog
+import yaml
 
-TRINO_HOST = "localhost"
-TRINO_PORT = 8080
-REST_CATALOG_URI = "http://localhost:8181"
-MINIO_ENDPOINT = "http://localhost:9000"
-MINIO_KEY = "minioadmin"
-MINIO_SECRET = "minioadmin"
-BUCKET = "lakehouse"
+from lakehouse_config import BUCKET, rest_catalog, s3_client, trino_connection
+from pipeline_selection import is_selected, reads_selected, restricted_note
+from tracing import span
 
 # Expected row counts driven by seed CSVs (raw_customers=100, raw_orders=99)
 EXPECTED_COUNTS = {
@@ -35,6 +35,80 @@ EXPECTED_COUNTS = {
     ("marts", "orders"): 99,
 }
 
+EXPECTED_TABLES = [
+    ("marts", "customers"),
+    ("marts", "orders"),
+    ("ddi", "rolling_30_day_orders"),
+    ("ddi", "at_risk_customers"),
+    ("ddi", "rolling_order_metrics"),
+    ("ddi", "customer_recency_cohorts"),
+    ("rollups", "orders_daily"),
+    ("rollups", "orders_weekly"),
+    ("rollups", "orders_monthly"),
+]
+
+ICEBERG_PREFIXES = {
+    "customers": "customers.iceberg/",
+    "orders": "orders.iceberg/",
+    "rolling_30_day_orders": "rolling_30_day_orders.iceberg/",
+    "at_risk_customers": "at_risk_customers.iceberg/",
+    "rolling_order_metrics": "rolling_order_metrics.iceberg/",
+    "customer_recency_cohorts": "customer_recency_cohorts.iceberg/",
+    "orders_daily": "orders_daily.iceberg/",
+    "orders_weekly": "orders_weekly.iceberg/",
+    "orders_monthly": "orders_monthly.iceberg/",
+}
+
+# Churn threshold shared with at_risk_customers and the Soda checks
+with open("dbt_project.yml") as f:
+    CHURN_THRESHOLD_DAYS = int(yaml.safe_load(f)["vars"]["churn_threshold_days"])
+
+# Business invariants: (label, SQL returning the number of violating rows, failure detail).
+# Also replayed by load_test_trino.py as part of its query mix.
+INVARIANTS = [
+    (
+        f"at_risk_customers: all rows have days_since_last_order >= {CHURN_THRESHOLD_DAYS}",
+        "SELECT count(*) FROM lakehouse.ddi.at_risk_customers "
+        f"WHERE days_since_last_order < {CHURN_THRESHOLD_DAYS}",
+        f"rows violate the >= {CHURN_THRESHOLD_DAYS} threshold",
+    ),
+    (
+        "rolling_30_day_orders: rolling_30_day_amount >= total_amount on every row",
+        "SELECT count(*) FROM lakehouse.ddi.rolling_30_day_orders "
+        "WHERE rolling_30_day_amount < total_amount",
+        "rows violate the rolling >= daily invariant",
+    ),
+    (
+        "rolling_order_metrics: 7d <= 30d <= 90d rolling amount on every row",
+        "SELECT count(*) FROM lakehouse.ddi.rolling_order_metrics "
+        "WHERE rolling_7d_amount > rolling_30d_amount OR rolling_30d_amount > rolling_90d_amount",
+        "rows have a shorter window exceeding a longer one",
+    ),
+    (
+        "marts.customers: customer_lifetime_value >= 0 (amounts in cents)",
+        "SELECT count(*) FROM lakehouse.marts.customers "
+        "WHERE customer_lifetime_value < 0",
+        "rows have negative lifetime value",
+    ),
+    (
+        "marts.orders: amount == sum of payment-method columns",
+        "SELECT count(*) FROM lakehouse.marts.orders "
+        "WHERE amount != credit_card_amount + coupon_amount + bank_transfer_amount + gift_card_amount",
+        "rows have amount mismatch",
+    ),
+] + [
+    (
+        f"rollups.{rollup}: order_count and amount totals match marts.orders",
+        "SELECT count(*) FROM ("
+        f"  SELECT sum(order_count) AS n, sum(amount) AS amount FROM lakehouse.rollups.{rollup}"
+        ") r CROSS JOIN ("
+        "  SELECT count(*) AS n, sum(amount) AS amount FROM lakehouse.marts.orders"
+        ") o WHERE r.n != o.n OR r.amount != o.amount",
+        "rollup totals differ from marts.orders — stale rollup snapshot?",
+    )
+    for rollup in ("orders_daily", "orders_weekly", "orders_monthly")
+]
+
 PASS = "PASS"
 FAIL = "FAIL"
 failures = []
@@ -49,13 +123,12 @@ def check(label, condition, detail=""):
 
 
 def trino_query(sql):
-    conn = trino.dbapi.connect(
-        host=TRINO_HOST, port=TRINO_PORT,
-        user="trino_user", http_scheme="http",
-    )
-    cur = conn.cursor()
-    cur.execute(sql)
-    return cur.fetchall()
+    with span("trino query", **{"db.statement": sql}) as s:
+        cur = trino_connection().cursor()
+        cur.execute(sql)
+        rows = cur.fetchall()
+        s.set("rows", len(rows))
+        return rows
 
 
 def count(schema, table):
@@ -69,111 +142,97 @@ def violation_count(sql):
     return rows[0][0]
 
 
-# ── 1. Iceberg REST catalog ──────────────────────────────────────────────────
-print("-- Iceberg REST catalog")
-catalog = RestCatalog("rest", uri=REST_CATALOG_URI)
-
-expected_tables = [
-    ("marts", "customers"),
-    ("marts", "orders"),
-    ("ddi", "rolling_30_day_orders"),
-    ("ddi", "at_risk_customers"),
-]
-for schema, table in expected_tables:
-    try:
-        registered = [(ns, t) for ns, t in catalog.list_tables(schema)]
-        found = (schema, table) in registered or any(t == table for _, t in registered)
-        check(f"Iceberg catalog: {schema}.{table} registered", found)
-    except Exception as e:
-        check(f"Iceberg catalog: {schema}.{table} registered", False, str(e))
-
-# ── 2. MinIO Parquet files ───────────────────────────────────────────────────
-print("\n-- MinIO Parquet data files")
-s3 = boto3.client(
-    "s3", endpoint_url=MINIO_ENDPOINT,
-    aws_access_key_id=MINIO_KEY, aws_secret_access_key=MINIO_SECRET,
-)
-iceberg_prefixes = {
-    "customers": "customers.iceberg/",
-    "orders": "orders.iceberg/",
-    "rolling_30_day_orders": "rolling_30_day_orders.iceberg/",
-    "at_risk_customers": "at_risk_customers.iceberg/",
-}
-for tbl, prefix in iceberg_prefixes.items():
-    resp = s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix + "data/")
-    parquet_files = [o for o in resp.get("Contents", []) if o["Key"].endswith(".parquet")]
-    check(f"MinIO: {tbl} has Parquet data files", len(parquet_files) > 0,
-          f"found {len(parquet_files)} files under s3://{BUCKET}/{prefix}data/")
-
-# ── 3. Trino row counts ──────────────────────────────────────────────────────
-print("\n-- Trino row counts")
-for (schema, table), expected in EXPECTED_COUNTS.items():
-    try:
-        n = count(schema, table)
-        check(
-            f"lakehouse.{schema}.{table}: {n} rows == {expected} (seed count)",
-            n == expected,
-            f"got {n}, expected {expected} — possible stale Iceberg snapshot",
-        )
-    except Exception as e:
-        check(f"lakehouse.{schema}.{table} row count", False, str(e))
-
-for schema, table in [("ddi", "rolling_30_day_orders"), ("ddi", "at_risk_customers")]:
-    try:
-        n = count(schema, table)
-        check(f"lakehouse.{schema}.{table}: has rows", n > 0, f"got {n}")
-    except Exception as e:
-        check(f"lakehouse.{schema}.{table} has rows", False, str(e))
-
-# ── 4. Business invariants ───────────────────────────────────────────────────
-print("\n-- Business invariants")
-
-try:
-    bad = violation_count(
-        "SELECT count(*) FROM lakehouse.ddi.at_risk_customers "
-        "WHERE days_since_last_order < 60"
-    )
-    check("at_risk_customers: all rows have days_since_last_order >= 60", bad == 0,
-          f"{bad} rows violate the >= 60 threshold")
-except Exception as e:
-    check("at_risk_customers: days_since_last_order >= 60", False, str(e))
-
-try:
-    bad = violation_count(
-        "SELECT count(*) FROM lakehouse.ddi.rolling_30_day_orders "
-        "WHERE rolling_30_day_amount < total_amount"
-    )
-    check("rolling_30_day_orders: rolling_30_day_amount >= total_amount on every row", bad == 0,
-          f"{bad} rows violate the rolling >= daily invariant")
-except Exception as e:
-    check("rolling_30_day_orders: rolling amount >= daily", False, str(e))
+def main():
+    tables = [(schema, table) for schema, table in EXPECTED_TABLES if is_selected(schema, table)]
+    if restricted_note(len(EXPECTED_TABLES)):
+        print(restricted_note(len(EXPECTED_TABLES)) + "\n")
+
+    # ── 1. Iceberg REST catalog ──────────────────────────────────────────────
+    print("-- Iceberg REST catalog")
+    catalog = rest_catalog()
+
+    for schema, table in tables:
+        try:
+            with span("iceberg-rest list_tables", table=f"{schema}.{table}"):
+                registered = [(ns, t) for ns, t in catalog.list_tables(schema)]
+            found = (schema, table) in registered or any(t == table for _, t in registered)
+            check(f"Iceberg catalog: {schema}.{table} registered", found)
+        except Exception as e:
+            check(f"Iceberg catalog: {schema}.{table} registered", False, str(e))
+
+    # ── 2. MinIO Parquet files ───────────────────────────────────────────────
+    print("\n-- MinIO Parquet data files")
+    s3 = s3_client()
+    for tbl, prefix in ICEBERG_PREFIXES.items():
+        if not any(table == tbl for _, table in tables):
+            continue
+        resp = s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix + "data/")
+        parquet_files = [o for o in resp.get("Contents", []) if o["Key"].endswith(".parquet")]
+        check(f"MinIO: {tbl} has Parquet data files", len(parquet_files) > 0,
+              f"found {len(parquet_files)} files under s3://{BUCKET}/{prefix}data/")
+
+    # ── 3. Trino row counts ──────────────────────────────────────────────────
+    print("\n-- Trino row counts")
+    for (schema, table), expected in EXPECTED_COUNTS.items():
+        if not is_selected(schema, table):
+            continue
+        try:
+            n = count(schema, table)
+            check(
+                f"lakehouse.{schema}.{table}: {n} rows == {expected} (seed count)",
+                n == expected,
+                f"got {n}, expected {expected} — possible stale Iceberg snapshot",
+            )
+        except Exception as e:
+            check(f"lakehouse.{schema}.{table} row count", False, str(e))
+
+    for schema, table in [
+        ("ddi", "rolling_30_day_orders"),
+        ("ddi", "at_risk_customers"),
+        ("ddi", "rolling_order_metrics"),
+    ]:
+        if not is_selected(schema, table):
+            continue
+        try:
+            n = count(schema, table)
+            check(f"lakehouse.{schema}.{table}: has rows", n > 0, f"got {n}")
+        except Exception as e:
+            check(f"lakehouse.{schema}.{table} has rows", False, str(e))
+
+    # ── 4. Business invariants ───────────────────────────────────────────────
+    print("\n-- Business invariants")
+
+    for label, sql, detail in INVARIANTS:
+        if not reads_selected(sql):
+            continue
+        try:
+            bad = violation_count(sql)
+            check(label, bad == 0, f"{bad} {detail}")
+        except Exception as e:
+            check(label, False, str(e))
+
+    if is_selected("ddi", "at_risk_customers") or is_selected("ddi", "customer_recency_cohorts"):
+        try:
+            at_risk = count("ddi", "at_risk_customers")
+            cohort = trino_query(
+                "SELECT count(*) FROM lakehouse.ddi.customer_recency_cohorts "
+                f"WHERE recency_cohort_days >= {CHURN_THRESHOLD_DAYS}"
+            )[0][0]
+            check("at_risk_customers matches customer_recency_cohorts at the churn threshold",
+                  at_risk == cohort, f"at_risk_customers={at_risk}, cohorts={cohort}")
+        except Exception as e:
+            check("at_risk_customers vs customer_recency_cohorts", False, str(e))
+
+    # ── Summary ──────────────────────────────────────────────────────────────
+    print()
+    if failures:
+        print(f"FAILED ({len(failures)} check(s)):")
+        for f in failures:
+            print(f"  - {f}")
+        sys.exit(1)
+    else:
+        print("All checks passed.")
 
-try:
-    bad = violation_count(
-        "SELECT count(*) FROM lakehouse.marts.customers "
-        "WHERE customer_lifetime_value < 0"
-    )
-    check("marts.customers: customer_lifetime_value >= 0 (amounts in cents)", bad == 0,
-          f"{bad} rows have negative lifetime value")
-except Exception as e:
-    check("marts.customers: lifetime_value >= 0", False, str(e))
 
-try:
-    bad = violation_count(
-        "SELECT count(*) FROM lakehouse.marts.orders "
-        "WHERE amount != credit_card_amount + coupon_amount + bank_transfer_amount + gift_card_amount"
-    )
-    check("marts.orders: amount == sum of payment-method columns", bad == 0,
-          f"{bad} rows have amount mismatch")
-except Exception as e:
-    check("marts.orders: amount == payment method sum", False, str(e))
-
-# ── Summary ──────────────────────────────────────────────────────────────────
-print()
-if failures:
-    print(f"FAILED ({len(failures)} check(s)):")
-    for f in failures:
-        print(f"  - {f}")
-    sys.exit(1)
-else:
-    print("All checks passed.")
+if __name__ == "__main__":
+    main()
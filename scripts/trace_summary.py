@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Summarize a pipeline trace written by tracing.py (OTLP/JSON lines).
+
+Prints, for the most recent trace in the file (or --trace-id):
+  - the span tree down to --depth levels, with duration and key attributes;
+  - the critical path: starting from each root, repeatedly follow the child that
+    finished last before the current cursor, so concurrent children that did not
+    delay the parent are skipped;
+  - the spans with the most self time (duration not covered by children).
+
+Usage:
+    python scripts/trace_summary.py target/pipeline_trace.jsonl [--depth 3] [--top 10]
+"""
+
+import argparse
+import json
+import sys
+
+SHOWN_ATTRIBUTES = ("http.status_code", "http.retries", "aws.retries",
+                    "http.response_bytes", "aws.response_bytes", "rows", "table")
+
+
+def attribute_value(value):
+    for kind in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if kind in value:
+            return int(value[kind]) if kind == "intValue" else value[kind]
+    return None
+
+
+def load_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line)["resourceSpans"]:
+                service = next(
+                    (attribute_value(a["value"]) for a in resource_spans["resource"]["attributes"]
+                     if a["key"] == "service.name"),
+                    "",
+                )
+                for scope_spans in resource_spans["scopeSpans"]:
+                    for s in scope_spans["spans"]:
+                        spans.append({
+                            "trace_id": s["traceId"],
+                            "id": s["spanId"],
+                            "parent": s.get("parentSpanId"),
+                            "name": s["name"],
+                            "service": service,
+                            "start": int(s["startTimeUnixNano"]),
+                            "end": int(s["endTimeUnixNano"]),
+                            "error": s.get("status", {}).get("code") == 2,
+                            "attributes": {a["key"]: attribute_value(a["value"]) for a in s.get("attributes", [])},
+                            "children": [],
+                        })
+    return spans
+
+
+def build_tree(spans):
+    by_id = {s["id"]: s for s in spans}
+    roots = []
+    for s in spans:
+        parent = by_id.get(s["parent"])
+        (parent["children"] if parent else roots).append(s)
+    for s in spans:
+        s["children"].sort(key=lambda c: c["start"])
+    return sorted(roots, key=lambda r: r["start"])
+
+
+def seconds(span):
+    return (span["end"] - span["start"]) / 1e9
+
+
+def self_time(span):
+    """Duration minus the union of child intervals."""
+    covered, cursor = 0, span["start"]
+    for child in sorted(span["children"], key=lambda c: c["start"]):
+        start, end = max(child["start"], cursor), min(child["end"], span["end"])
+        if end > start:
+            covered += end - start
+            cursor = end
+    return (span["end"] - span["start"] - covered) / 1e9
+
+
+def critical_path(span, depth=0):
+    """[(depth, span)]: `span`, then the chain of children that bounded its end, expanded."""
+    path = [(depth, span)]
+    cursor = max([span["end"]] + [c["end"] for c in span["children"]])
+    blocking = []
+    for child in sorted(span["children"], key=lambda c: c["end"], reverse=True):
+        if child["end"] <= cursor:
+            blocking.append(child)
+            cursor = child["start"]
+    for child in reversed(blocking):
+        path += critical_path(child, depth + 1)
+    return path
+
+
+def describe(span):
+    attrs = " ".join(
+        f"{key}={span['attributes'][key]}" for key in SHOWN_ATTRIBUTES if key in span["attributes"]
+    )
+    flag = " [ERROR]" if span["error"] else ""
+    return f"{span['name']}{flag}" + (f"  ({attrs})" if attrs else "")
+
+
+def print_tree(span, depth, max_depth, indent=""):
+    print(f"  {seconds(span):>9.3f}s  {indent}{describe(span)}")
+    if depth < max_depth:
+        for child in span["children"]:
+            print_tree(child, depth + 1, max_depth, indent + "  ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("trace_file")
+    parser.add_argument("--trace-id", help="trace to summarize (default: most recent)")
+    parser.add_argument("--depth", type=int, default=2, help="span tree depth to print")
+    parser.add_argument("--top", type=int, default=10, help="spans to list by self time")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    if not spans:
+        sys.exit(f"No spans in {args.trace_file}")
+    trace_id = args.trace_id or max(spans, key=lambda s: s["end"])["trace_id"]
+    spans = [s for s in spans if s["trace_id"] == trace_id]
+    roots = build_tree(spans)
+
+    total = (max(s["end"] for s in spans) - min(s["start"] for s in spans)) / 1e9
+    print(f"-- Trace {trace_id}: {len(spans)} spans, {total:.1f}s wall")
+    for root in roots:
+        print_tree(root, 0, args.depth)
+
+    print("\n-- Critical path")
+    for root in roots:
+        for depth, s in critical_path(root):
+            print(f"  {seconds(s):>9.3f}s  {'  ' * depth}{describe(s)}")
+
+    print(f"\n-- Top {args.top} spans by self time")
+    for s in sorted(spans, key=self_time, reverse=True)[:args.top]:
+        print(f"  {self_time(s):>9.3f}s  {s['service']}: {describe(s)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Hierarchical timing spans for the pipeline scripts, exported as OpenTelemetry JSON.
+
+Spans nest per thread through contextvars (pipeline stage → table → S3 / REST /
+Trino / Superset call) and carry attributes such as bytes transferred and retry
+counts. When PIPELINE_TRACE_FILE is set, each process appends one OTLP/JSON
+`ExportTraceServiceRequest` line (the OpenTelemetry Collector file-exporter
+format) to it at exit; otherwise spans are discarded.
+
+    from tracing import span, instrument_boto3, instrument_session
+
+    with span("register", table="marts.orders") as s:
+        ...
+        s.set("rows", n)
+
+  - instrument_session(session, "superset"): one span per requests call, with
+    status, response bytes and urllib3 retry count;
+  - instrument_boto3(client): one span per botocore API call, with bytes and
+    RetryAttempts;
+  - ThreadPoolExecutor: drop-in executor whose tasks inherit the submitting span.
+
+run_checks.sh sets PIPELINE_TRACE_ID so every stage shares one trace, and runs
+each stage under `python scripts/tracing.py run <stage> -- <command>`, which
+makes the stage span the parent of the spans its subprocess records
+(PIPELINE_PARENT_SPAN_ID). Summarize a trace with scripts/trace_summary.py.
+"""
+
+import atexit
+import concurrent.futures
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+
+TRACE_FILE = os.environ.get("PIPELINE_TRACE_FILE")
+TRACE_ID = os.environ.get("PIPELINE_TRACE_ID") or secrets.token_hex(16)
+PARENT_SPAN_ID = os.environ.get("PIPELINE_PARENT_SPAN_ID")
+SERVICE_NAME = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+
+_current = contextvars.ContextVar("current_span", default=None)
+_finished = []
+_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, attributes, parent_id):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_otlp(self):
+        span = {
+            "traceId": TRACE_ID,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def start_span(name, **attributes):
+    """Open a span as a child of the current one; close it with end_span()."""
+    parent = _current.get()
+    new = Span(name, attributes, parent.span_id if parent else PARENT_SPAN_ID)
+    return new, _current.set(new)
+
+
+def end_span(span, token, error=None):
+    span.end_ns = time.time_ns()
+    span.error = error
+    _current.reset(token)
+    with _lock:
+        _finished.append(span)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    current, token = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, token, f"{type(e).__name__}: {e}")
+        raise
+    end_span(current, token, current.error)
+
+
+def current_span():
+    return _current.get()
+
+
+class ThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run as children of the submitting span."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+def instrument_session(session, service):
+    """Record every request made through a requests.Session as a span."""
+    send = session.request
+
+    def traced_request(method, url, *args, **kwargs):
+        path = url.split("://", 1)[-1].partition("/")[2].split("?")[0]
+        with span(f"{service} {method} /{path}", **{"http.method": method, "http.url": url}) as s:
+            resp = send(method, url, *args, **kwargs)
+            s.set("http.status_code", resp.status_code)
+            s.set("http.response_bytes", len(resp.content))
+            retries = getattr(getattr(resp.raw, "retries", None), "history", None)
+            s.set("http.retries", len(retries or ()))
+            if resp.status_code >= 400:
+                s.error = f"HTTP {resp.status_code}"
+            return resp
+
+    session.request = traced_request
+    return session
+
+
+def instrument_boto3(client):
+    """Record every botocore API call on a client (S3/MinIO) as a span."""
+    service = client.meta.service_model.service_name
+
+    def before_call(model, params, context, **kwargs):
+        attributes = {"aws.operation": model.name}
+        for field in ("Bucket", "Key", "Prefix"):
+            if field in params:
+                attributes[f"aws.{field.lower()}"] = params[field]
+        body = params.get("Body")
+        if isinstance(body, (bytes, str)):
+            attributes["aws.request_bytes"] = len(body)
+        context["trace_span"] = start_span(f"{service} {model.name}", **attributes)
+
+    def after_call(http_response, parsed, context, **kwargs):
+        if "trace_span" not in context:
+            return
+        current, token = context.pop("trace_span")
+        metadata = parsed.get("ResponseMetadata", {})
+        current.set("http.status_code", metadata.get("HTTPStatusCode", http_response.status_code))
+        current.set("aws.retries", metadata.get("RetryAttempts", 0))
+        if "ContentLength" in parsed:
+            current.set("aws.response_bytes", parsed["ContentLength"])
+        error = parsed.get("Error", {}).get("Code")
+        end_span(current, token, error)
+
+    def after_call_error(exception, context, **kwargs):
+        if "trace_span" in context:
+            current, token = context.pop("trace_span")
+            end_span(current, token, f"{type(exception).__name__}: {exception}")
+
+    client.meta.events.register(f"before-call.{service}", before_call)
+    client.meta.events.register(f"after-call.{service}", after_call)
+    client.meta.events.register(f"after-call-error.{service}", after_call_error)
+    return client
+
+
+def flush():
+    with _lock:
+        spans = list(_finished)
+        _finished.clear()
+    if not TRACE_FILE or not spans:
+        return
+    request = {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "jaffle_shop.pipeline"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]
+    }
+    with _lock, open(TRACE_FILE, "a") as f:
+        f.write(json.dumps(request) + "\n")
+
+
+atexit.register(flush)
+
+
+def main():
+    """`tracing.py trace-id` prints a new trace id; `tracing.py run NAME -- CMD...`
+    runs CMD inside a span named NAME and exits with its status."""
+    if sys.argv[1:2] == ["trace-id"]:
+        print(secrets.token_hex(16))
+        return
+    if len(sys.argv) < 5 or sys.argv[1] != "run" or sys.argv[3] != "--":
+        sys.exit("usage: tracing.py trace-id | tracing.py run NAME -- COMMAND [ARGS...]")
+    global SERVICE_NAME
+    SERVICE_NAME = "pipeline"
+    name, command = sys.argv[2], sys.argv[4:]
+    with span(name, command=" ".join(command)) as stage:
+        env = dict(os.environ, PIPELINE_TRACE_ID=TRACE_ID, PIPELINE_PARENT_SPAN_ID=stage.span_id)
+        returncode = subprocess.call(command, env=env)
+        stage.set("exit_code", returncode)
+        if returncode:
+            stage.error = f"exit code {returncode}"
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
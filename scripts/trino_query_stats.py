@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Record Trino query stats for the serving queries and flag regressions.
+
+Runs every dashboard chart query (setup_superset.dashboard_queries) and business
+invariant (test_trino.INVARIANTS) against Trino --runs times and records, per
+query, the stats Trino reports for the run: splits, processed and physical input
+bytes, rows, CPU, wall and elapsed time (median over runs). It also records the
+Iceberg layout of every serving table from its `$files` metadata table: data file
+count and total bytes.
+
+Each run is appended to a JSON-lines history. Compared with the previous run,
+a query is flagged when its input bytes or splits grow by more than
+--bytes-threshold, or its median elapsed time grows by more than
+--latency-threshold (and at least --min-ms). A table is flagged when its file
+count grows while its row count does not. These are the symptoms of lost
+partitioning or small-file bloat from the external materialization.
+
+Usage:
+    python scripts/trino_query_stats.py [--runs 3] [--fail-on-regression]
+    python scripts/trino_query_stats.py --explain-dir target/explain   # also save EXPLAIN ANALYZE plans
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+from lakehouse_config import trino_connection
+from setup_superset import dashboard_queries
+from test_trino import EXPECTED_TABLES, INVARIANTS
+
+HISTORY = "trino_query_stats_history.jsonl"
+
+# Trino client stats recorded per query: the median across runs is kept.
+STAT_FIELDS = {
+    "elapsed_ms": "elapsedTimeMillis",
+    "wall_ms": "wallTimeMillis",
+    "cpu_ms": "cpuTimeMillis",
+    "splits": "totalSplits",
+    "processed_rows": "processedRows",
+    "processed_bytes": "processedBytes",
+    "physical_input_bytes": "physicalInputBytes",
+    "peak_memory_bytes": "peakMemoryBytes",
+}
+BYTES_FIELDS = ("processed_bytes", "physical_input_bytes", "splits")
+
+
+def serving_queries():
+    queries = [(f"chart: {name}", sql) for name, sql in dashboard_queries()]
+    queries += [(f"invariant: {label}", sql) for label, sql, _ in INVARIANTS]
+    return queries
+
+
+def run_query(cur, sql):
+    cur.execute(sql)
+    cur.fetchall()
+    stats = cur.stats or {}
+    return {field: stats.get(key) for field, key in STAT_FIELDS.items()}, cur.query_id
+
+
+def table_layout(cur, schema, table):
+    cur.execute(
+        "SELECT count(*), coalesce(sum(file_size_in_bytes), 0), coalesce(sum(record_count), 0) "
+        f'FROM lakehouse.{schema}."{table}$files"'
+    )
+    files, size, rows = cur.fetchone()
+    return {"files": files, "bytes": size, "rows": rows}
+
+
+def median_stats(samples):
+    merged = {}
+    for field in STAT_FIELDS:
+        values = [s[field] for s in samples if s.get(field) is not None]
+        merged[field] = statistics.median(values) if values else None
+    return merged
+
+
+def grew(current, previous, threshold):
+    return current is not None and previous and current > previous * (1 + threshold)
+
+
+def regressions(record, previous, bytes_threshold, latency_threshold, min_ms):
+    found = []
+    for label, stats in record["queries"].items():
+        before = previous["queries"].get(label)
+        if not before:
+            continue
+        for field in BYTES_FIELDS:
+            if grew(stats.get(field), before.get(field), bytes_threshold):
+                found.append(f"{label}: {field} {before[field]:.0f} → {stats[field]:.0f}")
+        now_ms, then_ms = stats.get("elapsed_ms"), before.get("elapsed_ms")
+        if grew(now_ms, then_ms, latency_threshold) and now_ms - then_ms >= min_ms:
+            found.append(f"{label}: elapsed {then_ms:.0f} ms → {now_ms:.0f} ms")
+    for table, layout in record["tables"].items():
+        before = previous["tables"].get(table)
+        if before and layout["files"] > before["files"] and layout["rows"] <= before["rows"]:
+            found.append(
+                f"{table}: {before['files']} → {layout['files']} data files for "
+                f"{layout['rows']} rows (small-file bloat or lost partitioning?)"
+            )
+    return found
+
+
+def load_previous(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=3, help="runs per query (median is recorded)")
+    parser.add_argument("--history", default=HISTORY, help="JSON-lines history store")
+    parser.add_argument("--bytes-threshold", type=float, default=0.10,
+                        help="flag input bytes/splits growth above this fraction")
+    parser.add_argument("--latency-threshold", type=float, default=0.50,
+                        help="flag elapsed time growth above this fraction")
+    parser.add_argument("--min-ms", type=float, default=100, help="minimum elapsed growth to flag")
+    parser.add_argument("--explain-dir", help="write EXPLAIN ANALYZE output per query here")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args()
+
+    cur = trino_connection().cursor()
+    record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "queries": {}, "tables": {}}
+
+    print("-- Iceberg table layout")
+    for schema, table in EXPECTED_TABLES:
+        layout = table_layout(cur, schema, table)
+        record["tables"][f"{schema}.{table}"] = layout
+        print(f"  {schema + '.' + table:<36} {layout['files']:>5} files {layout['bytes'] / 1024:>10.1f} KiB "
+              f"{layout['rows']:>8} rows")
+
+    print(f"\n-- Query stats (median of {args.runs} run(s))")
+    print(f"  {'query':<60} {'ms':>7} {'cpu ms':>7} {'splits':>6} {'input KiB':>10}")
+    if args.explain_dir:
+        os.makedirs(args.explain_dir, exist_ok=True)
+    for label, sql in serving_queries():
+        samples = []
+        query_id = None
+        for _ in range(args.runs):
+            stats, query_id = run_query(cur, sql)
+            samples.append(stats)
+        stats = median_stats(samples)
+        stats["query_id"] = query_id
+        record["queries"][label] = stats
+        input_bytes = stats["physical_input_bytes"] or stats["processed_bytes"] or 0
+        print(f"  {label[:60]:<60} {stats['elapsed_ms'] or 0:>7.0f} {stats['cpu_ms'] or 0:>7.0f} "
+              f"{stats['splits'] or 0:>6.0f} {input_bytes / 1024:>10.1f}")
+
+        if args.explain_dir:
+            cur.execute(f"EXPLAIN ANALYZE {sql}")
+            plan = "\n".join(row[0] for row in cur.fetchall())
+            name = re.sub(r"\W+", "_", label).strip("_").lower()
+            with open(os.path.join(args.explain_dir, f"{name}.txt"), "w") as f:
+                f.write(f"-- {label}\n{sql}\n\n{plan}\n")
+
+    previous = load_previous(args.history)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if previous is None:
+        print(f"\nRecorded baseline in {args.history}.")
+        return
+    found = regressions(record, previous, args.bytes_threshold, args.latency_threshold, args.min_ms)
+    print(f"\n-- Regressions vs run at {previous['timestamp']}")
+    if not found:
+        print("  [PASS] no query or table regressed")
+        return
+    for line in found:
+        print(f"  [FAIL] {line}")
+    if args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
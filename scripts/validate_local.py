@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Post-build validation in an embedded DuckDB session: no Trino required.
+
+The external materialization writes every serving model as an Iceberg table
+under external_root and reads it back with iceberg_scan(). This runner does the
+same in-process: it attaches an in-memory catalog named `lakehouse` with one view
+per table (lakehouse.<schema>.<table> → iceberg_scan('<external_root>/<table>.iceberg')),
+so the Trino SQL in test_trino.INVARIANTS runs unchanged. httpfs/S3 settings and
+extensions come from the dbt profile (profiles.yml), via lakehouse_duckdb.py.
+
+Checks, all run concurrently on per-thread DuckDB cursors:
+  - test_trino.INVARIANTS and the at_risk_customers / customer_recency_cohorts match
+  - the Soda checks generated from the dbt contracts being built (the same
+    checks soda-gen writes to soda/soda_checks_*.yml, which run_checks.sh only
+    refreshes later) and seed row counts, via check_iceberg_stats.load_checks,
+    translated to SQL
+
+Under `run_checks.sh --changed` only the checks that read a table selected by
+state:modified+ run (pipeline_selection.py).
+
+test_trino.py and the Soda scans remain the end-to-end smoke test of the Trino
+serving path. Exit 1 on any failure.
+
+With --cache, DuckDB reads S3 through s3_cache.CachedS3FileSystem instead of
+httpfs, so repeated runs serve unchanged Iceberg files from local disk.
+
+Usage:
+    python scripts/validate_local.py [--workers 8] [--cache]
+"""
+
+import argparse
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from check_iceberg_stats import load_checks
+from lakehouse_duckdb import connect, profile_cache, profile_output, sql_literal
+from pipeline_selection import is_selected, reads_selected, restricted_note
+from test_trino import CHURN_THRESHOLD_DAYS, EXPECTED_TABLES, INVARIANTS
+
+CHECK_PATTERN = re.compile(r"^(\w+)(?:\((\w+)\))?\s*(>=|<=|=|>|<)\s*(-?\d+(?:\.\d+)?)$")
+OPERATORS = {
+    "=": lambda a, b: a == b, ">=": lambda a, b: a >= b, "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b, "<": lambda a, b: a < b,
+}
+
+PASS = "PASS"
+FAIL = "FAIL"
+
+
+def contract_sql(schema, table, metric, column, options):
+    """SQL returning the Soda metric value for one table, or None if unsupported."""
+    relation = f"lakehouse.{schema}.{table}"
+    if metric == "row_count":
+        return f"SELECT count(*) FROM {relation}"
+    if metric == "missing_count":
+        return f"SELECT count(*) - count({column}) FROM {relation}"
+    if metric == "duplicate_count":
+        return (
+            f"SELECT count(*) FROM (SELECT {column} FROM {relation} "
+            f"WHERE {column} IS NOT NULL GROUP BY {column} HAVING count(*) > 1)"
+        )
+    if metric in ("min", "max"):
+        return f"SELECT {metric}({column}) FROM {relation}"
+    if metric == "invalid_percent" and "valid values" in options:
+        values = ", ".join(sql_literal(v) for v in options["valid values"])
+        return (
+            f"SELECT coalesce(100.0 * count(*) FILTER (WHERE {column} IS NOT NULL "
+            f"AND {column} NOT IN ({values})) / nullif(count(*), 0), 0) FROM {relation}"
+        )
+    return None
+
+
+def build_checks():
+    """[(label, sql, predicate(value) -> bool, detail template)] for every local check."""
+    checks = [
+        (label, sql, lambda bad: bad == 0, "{} " + detail)
+        for label, sql, detail in INVARIANTS
+    ]
+    checks.append((
+        "at_risk_customers matches customer_recency_cohorts at the churn threshold",
+        "SELECT (SELECT count(*) FROM lakehouse.ddi.at_risk_customers) - "
+        "(SELECT count(*) FROM lakehouse.ddi.customer_recency_cohorts "
+        f"WHERE recency_cohort_days >= {CHURN_THRESHOLD_DAYS})",
+        lambda diff: diff == 0,
+        "row counts differ by {}",
+    ))
+
+    for schema, table, expression, options in load_checks(from_contracts=True):
+        if not is_selected(schema, table):
+            continue
+        match = CHECK_PATTERN.match(expression)
+        sql = match and contract_sql(schema, table, match.group(1), match.group(2), options)
+        if not sql:
+            print(f"  [skip] {schema}.{table}: {expression} (no local translation)")
+            continue
+        op, threshold = match.group(3), float(match.group(4))
+        checks.append((
+            f"{schema}.{table}: {expression}",
+            sql,
+            lambda value, op=op, threshold=threshold: (
+                value is not None and OPERATORS[op](float(value), threshold)
+            ),
+            "got {}",
+        ))
+    return [check for check in checks if reads_selected(check[1])]
+
+
+def run_check(con, check):
+    label, sql, predicate, detail = check
+    cursor = con.cursor()  # one connection per thread over the same in-process database
+    try:
+        value = cursor.execute(sql).fetchone()[0]
+        return label, predicate(value), detail.format(value)
+    except Exception as e:
+        return label, False, str(e)
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--workers", type=int, default=8, help="concurrent DuckDB cursors")
+    parser.add_argument("--cache", action="store_true",
+                        help="read S3 through the local Iceberg file cache (s3_cache.py)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output = profile_output()
+    cache = profile_cache(output) if args.cache else None
+    con = connect(output, EXPECTED_TABLES, cache)
+    checks = build_checks()
+
+    print(f"-- Local DuckDB validation ({len(checks)} checks, {args.workers} workers)")
+    if restricted_note(len(EXPECTED_TABLES)):
+        print(f"   {restricted_note(len(EXPECTED_TABLES))}")
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda check: run_check(con, check), checks))
+
+    failures = []
+    for label, ok, detail in results:
+        if ok:
+            print(f"  [{PASS}] {label}")
+        else:
+            print(f"  [{FAIL}] {label}: {detail}")
+            failures.append(label)
+
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
+    if cache:
+        cache.save()
+        print(cache.summary())
+    if failures:
+        print(f"FAILED ({len(failures)} check(s)):")
+        for f in failures:
+            print(f"  - {f}")
+        sys.exit(1)
+    print("All checks passed.")
+
+
+if __name__ == "__main__":
+    main()